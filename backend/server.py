@@ -1,41 +1,102 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.concurrency import iterate_in_threadpool
+from starlette.routing import Match
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import InsertOne, UpdateOne, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from gridfs.errors import NoFile
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, AsyncIterator, Tuple
 import uuid
 from datetime import datetime, timezone
 import pandas as pd
 import PyPDF2
 import io
+import tempfile
+import hashlib
+import base64
 import json
+import csv
 import xlsxwriter
+from openpyxl import load_workbook
 from passlib.context import CryptContext
 import jwt
 from datetime import timedelta
 import magic
 import bleach
 import re
+import unicodedata
+import time
+import threading
+import asyncio
+import itertools
+import functools
+import ipaddress
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Database instrumentation
+# Every command sent to MongoDB is attributed to the request that issued it via a
+# contextvar (Motor copies the context into its executor threads, where pymongo
+# calls the listener). DBInstrumentationMiddleware opens the per-request scope.
+class DBRequestStats:
+    """Round trips and server-side time of the commands of one request"""
+    __slots__ = ("queries", "time_ms", "_lock")
+
+    def __init__(self):
+        self.queries = 0
+        self.time_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, duration_micros: int):
+        with self._lock:
+            self.queries += 1
+            self.time_ms += duration_micros / 1000
+
+db_request_stats: contextvars.ContextVar[Optional[DBRequestStats]] = contextvars.ContextVar(
+    "db_request_stats", default=None
+)
+
+class DBCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    @staticmethod
+    def _record(event):
+        stats = db_request_stats.get()
+        if stats is not None:
+            stats.add(event.duration_micros)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: timestamps are stored as BSON dates (UTC) and read back as aware datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[DBCommandListener()])
 db = client["iPadDatabase"]
+# Contract PDFs live in GridFS, contract documents only keep a file reference
+contract_files = AsyncIOMotorGridFSBucket(db, bucket_name="contract_files")
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -134,7 +195,9 @@ class Contract(BaseModel):
     itnr: Optional[str] = None
     student_name: Optional[str] = None
     filename: str
-    file_data: bytes
+    file_id: Optional[str] = None  # GridFS file in the contract_files bucket
+    file_size: Optional[int] = None
+    file_data: Optional[bytes] = None  # Legacy inline PDF, moved to GridFS by /contracts/migrate-files
     form_fields: Dict[str, Any]
     uploaded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
@@ -198,6 +261,19 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# bcrypt takes ~250ms per call. Running it on the event loop stalls every other
+# request, so all request handlers hash/verify through this bounded executor.
+HASHING_CONCURRENCY = max(1, int(os.environ.get("HASHING_CONCURRENCY", "2")))
+hashing_executor = ThreadPoolExecutor(max_workers=HASHING_CONCURRENCY, thread_name_prefix="bcrypt")
+
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hashing_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hashing_executor, get_password_hash, password)
+
 def create_access_token(data: dict, user_id: str, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     to_encode.update({"user_id": user_id})
@@ -209,6 +285,76 @@ def create_access_token(data: dict, user_id: str, expires_delta: Optional[timede
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
+# Authenticated user cache
+class UserCache:
+    """In-process TTL/LRU cache for user documents looked up by get_current_user.
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_size` is reached. Every endpoint that changes a user
+    (password, username, role, active flag, deletion) must call invalidate()
+    so that e.g. a deactivation takes effect with the next request.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return dict(user)
+
+    def set(self, user_id: str, user: dict):
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop a single user (or the whole cache if user_id is None)"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+user_cache = UserCache(
+    max_size=int(os.environ.get("USER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=["HS256"])
@@ -226,10 +372,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if datetime.now(timezone.utc).timestamp() > exp:
             raise HTTPException(status_code=401, detail="Token has expired")
         
-        # Get user from database to check if still active
-        user = await db.users.find_one({"id": user_id})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        # Get user (cached, invalidated on every user mutation) to check if still active
+        user = user_cache.get(user_id)
+        if user is None:
+            user = await db.users.find_one({"id": user_id})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            user_cache.set(user_id, user)
         
         if not user.get("is_active", True):
             raise HTTPException(status_code=401, detail="User account is deactivated")
@@ -242,22 +391,68 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Search keys
+# Name/class/ITNr filters match normalized keys stored next to the original
+# fields (lower-cased, umlauts folded, whitespace collapsed). User input is
+# folded the same way and becomes an escaped, anchored prefix match that can
+# walk an index, instead of an unanchored case-insensitive $regex scan.
+SEARCH_KEY_FIELDS = {
+    "sus_vorn": "sus_vorn_key",
+    "sus_nachn": "sus_nachn_key",
+    "sus_kl": "sus_kl_key",
+    "itnr": "itnr_key",
+}
+UMLAUT_FOLDS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+def fold_search_key(value) -> str:
+    """'  Müller-Lüdenscheidt ' -> 'mueller-luedenscheidt' (other accents are dropped)"""
+    text = unicodedata.normalize("NFC", " ".join(str(value).split())).lower().translate(UMLAUT_FOLDS)
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+
+def add_search_keys(data: dict) -> dict:
+    """Maintain the search keys of every searchable field present in a document"""
+    for field, key_field in SEARCH_KEY_FIELDS.items():
+        value = data.get(field)
+        if isinstance(value, str):
+            data[key_field] = fold_search_key(value)
+    return data
+
+def compile_search_filter(params: Dict[str, Optional[str]], exact: bool = False) -> dict:
+    """
+    Filter on the search keys for raw user input ({"sus_nachn": "Mü", ...}).
+    Default is an anchored prefix match; exact=True matches the whole key
+    (used by batch operations that must not hit more rows than named).
+    """
+    query = {}
+    for field, value in params.items():
+        if value is None:
+            continue
+        key = fold_search_key(value)
+        if not key:
+            continue
+        query[SEARCH_KEY_FIELDS[field]] = key if exact else {"$regex": "^" + re.escape(key)}
+    return query
+
 def prepare_for_mongo(data):
+    # Timestamps stay datetime objects and are stored as native BSON dates
     if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
+        add_search_keys(data)
     return data
 
-def parse_from_mongo(item):
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if isinstance(value, str) and key.endswith('_at'):
-                try:
-                    item[key] = datetime.fromisoformat(value)
-                except:
-                    pass
-    return item
+def parse_legacy_timestamp(value: str) -> Optional[datetime]:
+    """ISO string written by older versions -> aware datetime (naive values are UTC)"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def format_german_date(value) -> str:
+    """DD.MM.YYYY of a stored timestamp ('' if missing or unparsable)"""
+    if isinstance(value, str):
+        # Not migrated yet by /timestamps/migrate
+        value = parse_legacy_timestamp(value)
+    return value.strftime("%d.%m.%Y") if isinstance(value, datetime) else ""
 
 # Authorization Helper Functions
 def is_admin(user: dict) -> bool:
@@ -293,7 +488,7 @@ async def validate_resource_ownership(resource_type: str, resource_id: str, user
         raise HTTPException(status_code=400, detail=f"Invalid resource type: {resource_type}")
     
     # Check if resource exists and belongs to user
-    resource = await collection.find_one({"id": resource_id})
+    resource = await collection.find_one({"id": resource_id}, {"_id": 0, "user_id": 1})
     if not resource:
         raise HTTPException(status_code=404, detail=f"{resource_type.capitalize()} not found")
     
@@ -321,22 +516,335 @@ def sanitize_input(value: str, max_length: int = 255, allow_html: bool = False)
     return value.strip()
 
 # Security: HTTP Security Headers Middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY" 
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = "default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'; img-src 'self' data:; font-src 'self'"
-        
-        # HSTS for HTTPS
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"content-security-policy", b"default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'; img-src 'self' data:; font-src 'self'"),
+]
+HSTS_HEADER = (b"strict-transport-security", b"max-age=31536000; includeSubDomains")
+REQUEST_ID_PATTERN = re.compile(rb"^[A-Za-z0-9._-]{1,64}$")
+
+def incoming_request_id(scope) -> Optional[str]:
+    """X-Request-ID set by a proxy, if it is safe to echo back"""
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-id":
+            return value.decode("ascii") if REQUEST_ID_PATTERN.match(value) else None
+    return None
+
+class SecurityHeadersMiddleware:
+    """
+    Pure ASGI middleware: adds the security headers, an X-Request-ID and a
+    Server-Timing header (time until the response started, plus the DB time
+    of the request) to http.response.start. Body messages are passed through
+    untouched, so streamed exports and downloads are not buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = incoming_request_id(scope) or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        started = time.perf_counter()
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                timing = f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+                stats = db_request_stats.get()
+                if stats is not None:
+                    timing += f', db;dur={stats.time_ms:.1f};desc="{stats.queries} queries"'
+                headers = list(message.get("headers", []))
+                headers.extend(SECURITY_HEADERS)
+                if scope.get("scheme") == "https":
+                    headers.append(HSTS_HEADER)
+                headers.append((b"x-request-id", request_id.encode("ascii")))
+                headers.append((b"server-timing", timing.encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile (0.0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+class RouteDBMetrics:
+    """
+    Per-route aggregates of DB round trips, DB time and request latency.
+    Totals are kept since start (or reset); percentiles cover the last
+    `window` requests of a route.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._routes: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, stats: DBRequestStats, latency_ms: float):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0, "queries": 0, "queries_max": 0, "db_time_ms": 0.0,
+                    "recent_queries": deque(maxlen=self.window),
+                    "recent_db_ms": deque(maxlen=self.window),
+                    "recent_latency_ms": deque(maxlen=self.window),
+                }
+            entry["requests"] += 1
+            entry["queries"] += stats.queries
+            entry["queries_max"] = max(entry["queries_max"], stats.queries)
+            entry["db_time_ms"] += stats.time_ms
+            entry["recent_queries"].append(stats.queries)
+            entry["recent_db_ms"].append(stats.time_ms)
+            entry["recent_latency_ms"].append(latency_ms)
+
+    def snapshot(self) -> List[dict]:
+        """Routes ordered by queries per request (N+1 suspects first)"""
+        with self._lock:
+            routes = [(route, dict(entry, recent_queries=list(entry["recent_queries"]),
+                                   recent_db_ms=list(entry["recent_db_ms"]),
+                                   recent_latency_ms=list(entry["recent_latency_ms"])))
+                      for route, entry in self._routes.items()]
+        result = []
+        for route, entry in routes:
+            result.append({
+                "route": route,
+                "requests": entry["requests"],
+                "queries_total": entry["queries"],
+                "queries_per_request": round(entry["queries"] / entry["requests"], 2),
+                "queries_p95": percentile(entry["recent_queries"], 95),
+                "queries_max": entry["queries_max"],
+                "db_time_ms_total": round(entry["db_time_ms"], 1),
+                "db_time_ms_p50": round(percentile(entry["recent_db_ms"], 50), 1),
+                "db_time_ms_p95": round(percentile(entry["recent_db_ms"], 95), 1),
+                "latency_ms_p50": round(percentile(entry["recent_latency_ms"], 50), 1),
+                "latency_ms_p95": round(percentile(entry["recent_latency_ms"], 95), 1),
+            })
+        result.sort(key=lambda item: item["queries_per_request"], reverse=True)
+        return result
+
+    def get(self, route: str) -> Optional[dict]:
+        return next((item for item in self.snapshot() if item["route"] == route), None)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+db_route_metrics = RouteDBMetrics(window=int(os.environ.get("DB_METRICS_WINDOW", "1000")))
+
+def route_name(scope) -> str:
+    """Route template of a request ("GET /api/ipads/{ipad_id}") to keep metric labels bounded"""
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else '<unmatched>'}"
+
+class DBInstrumentationMiddleware:
+    """
+    Pure ASGI middleware: opens the DB stats scope of a request, adds
+    X-DB-Queries / X-DB-Time-ms headers (commands issued until the response
+    starts) and records the per-route aggregates once the body is sent, so
+    streamed exports count completely.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        stats = DBRequestStats()
+        token = db_request_stats.set(stats)
+        started = time.perf_counter()
+        
+        async def send_with_db_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.queries).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.time_ms:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
         
-        return response
+        try:
+            await self.app(scope, receive, send_with_db_headers)
+        finally:
+            db_request_stats.reset(token)
+            db_route_metrics.record(route_name(scope), stats, (time.perf_counter() - started) * 1000)
+
+# Prometheus metrics
+# In-process counters per route template, exposed as text exposition format at
+# GET /api/metrics. Labels only ever carry method, route template and status,
+# so the number of series stays bounded no matter which ids are requested.
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Tokenless scraping only from loopback by default: port 8001 is published on
+# the host, so LAN clients (or Docker's userland proxy on their behalf) reach
+# the backend directly. Widen only for networks nobody else can reach.
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip())
+    for network in os.environ.get("METRICS_ALLOWED_NETWORKS", "127.0.0.0/8,::1/128").split(",")
+    if network.strip()
+]
+
+class HTTPMetrics:
+    """Request counters, latency histograms, in-flight gauges and upload bytes per route"""
+
+    def __init__(self, buckets: Tuple[float, ...] = HTTP_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._latency: Dict[Tuple[str, str], List[float]] = {}  # bucket counts..., sum, count
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._upload_bytes: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def started(self, method: str, route: str):
+        with self._lock:
+            key = (method, route)
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def finished(self, method: str, route: str, status_code: int, seconds: float, body_bytes: int):
+        key = (method, route)
+        with self._lock:
+            self._in_flight[key] -= 1
+            request_key = (method, route, str(status_code))
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[index] += 1
+                    break
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            if body_bytes:
+                self._upload_bytes[key] = self._upload_bytes.get(key, 0) + body_bytes
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            latency = sorted((key, list(values)) for key, values in self._latency.items())
+            in_flight = sorted(self._in_flight.items())
+            upload_bytes = sorted(self._upload_bytes.items())
+
+        lines = [
+            "# HELP http_requests_total HTTP requests by route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in requests:
+            lines.append(f'http_requests_total{{{metric_labels(method, route)},status="{status_code}"}} {count}')
+
+        lines += [
+            "# HELP http_request_duration_seconds Time until the response body was sent.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in latency:
+            labels = metric_labels(method, route)
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram[-1]}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram[-2]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram[-1]}")
+
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being processed.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for (method, route), count in in_flight:
+            lines.append(f"http_requests_in_flight{{{metric_labels(method, route)}}} {count}")
+
+        lines += [
+            "# HELP http_request_body_bytes_total Request body (upload) bytes received.",
+            "# TYPE http_request_body_bytes_total counter",
+        ]
+        for (method, route), count in upload_bytes:
+            lines.append(f"http_request_body_bytes_total{{{metric_labels(method, route)}}} {count}")
+
+        lines += [
+            "# HELP db_commands_total MongoDB commands issued per route.",
+            "# TYPE db_commands_total counter",
+            "# HELP db_command_seconds_total Time spent in MongoDB commands per route.",
+            "# TYPE db_command_seconds_total counter",
+        ]
+        for entry in sorted(db_route_metrics.snapshot(), key=lambda item: item["route"]):
+            method, _, route = entry["route"].partition(" ")
+            labels = metric_labels(method, route)
+            lines.append(f"db_commands_total{{{labels}}} {entry['queries_total']}")
+            lines.append(f"db_command_seconds_total{{{labels}}} {entry['db_time_ms_total'] / 1000:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+http_metrics = HTTPMetrics()
+
+def metric_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metric_labels(method: str, route: str) -> str:
+    return f'method="{metric_label_value(method)}",route="{metric_label_value(route)}"'
+
+def resolve_route_template(scope) -> str:
+    """Route template before the router runs (needed for the in-flight gauge)"""
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # path matches, method does not (405)
+    return partial or "<unmatched>"
+
+class PrometheusMetricsMiddleware:
+    """
+    Pure ASGI middleware feeding http_metrics. The status code is taken from
+    http.response.start, latency is measured until the last body chunk is
+    sent and upload bytes are counted while the app reads the request body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        route = resolve_route_template(scope)
+        status_code = 500  # app raised before starting a response
+        body_bytes = 0
+        
+        async def receive_counting():
+            nonlocal body_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                body_bytes += len(message.get("body", b""))
+            return message
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        http_metrics.started(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_counting, send_with_status)
+        finally:
+            http_metrics.finished(method, route, status_code, time.perf_counter() - started, body_bytes)
 
 # Security: File validation function
 def validate_uploaded_file(file_content: bytes, filename: str, max_size_mb: int = 10, allowed_types: list = None):
@@ -367,6 +875,152 @@ def validate_uploaded_file(file_content: bytes, filename: str, max_size_mb: int
     
     return True
 
+# Spreadsheet reading
+# Known columns of SchILD student exports and Bestandslisten (lowercase) -> model field
+STUDENT_COLUMNS = {
+    "sname": "sname",
+    "susnachn": "sus_nachn",
+    "susvorn": "sus_vorn",
+    "suskl": "sus_kl",
+    "susstrhnr": "sus_str_hnr",
+    "susplz": "sus_plz",
+    "susort": "sus_ort",
+    "susgeb": "sus_geb",
+    "erz1nachn": "erz1_nachn",
+    "erz1vorn": "erz1_vorn",
+    "erz1strhnr": "erz1_str_hnr",
+    "erz1plz": "erz1_plz",
+    "erz1ort": "erz1_ort",
+    "erz2nachn": "erz2_nachn",
+    "erz2vorn": "erz2_vorn",
+    "erz2strhnr": "erz2_str_hnr",
+    "erz2plz": "erz2_plz",
+    "erz2ort": "erz2_ort"
+}
+INVENTORY_IPAD_COLUMNS = ["itnr", "snr", "typ", "pencil", "anschjahr", "ausleihedatum"]
+
+def cell_to_str(value) -> str:
+    """Convert a spreadsheet cell to a stripped string ('' for empty cells)"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        value = value.strip()
+        return '' if value.lower() == 'nan' else value
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ''
+        return str(int(value)) if value.is_integer() else str(value)
+    if isinstance(value, datetime):
+        if value.hour == 0 and value.minute == 0 and value.second == 0:
+            return value.strftime("%Y-%m-%d")
+        return value.isoformat(sep=' ')
+    return str(value).strip()
+
+BIRTH_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def normalize_birth_date(value) -> str:
+    """
+    Canonical stored form of a birth date: YYYY-MM-DD.
+    
+    Accepts DD.MM.YYYY, YYYY-MM-DD (optionally with a time part), YYYYMMDD
+    and DD/MM/YYYY. Values that cannot be parsed are kept (stripped) so no
+    information is lost; empty values become ''.
+    """
+    value = cell_to_str(value)
+    if not value or BIRTH_DATE_PATTERN.match(value):
+        return value
+    try:
+        if "." in value:
+            day, month, year = value.split(".")
+        elif "/" in value:
+            day, month, year = value.split("/")
+        elif "-" in value:
+            # ISO format, remove time part if present
+            year, month, day = value.replace("T", " ").split(" ")[0].split("-")
+        elif len(value) == 8 and value.isdigit():
+            year, month, day = value[:4], value[4:6], value[6:]
+        else:
+            return value
+        return datetime(int(year), int(month), int(day)).strftime("%Y-%m-%d")
+    except ValueError:
+        return value
+
+@functools.lru_cache(maxsize=4096)
+def _format_legacy_birth_date(value: str) -> str:
+    normalized = normalize_birth_date(value)
+    return format_birth_date(normalized) if BIRTH_DATE_PATTERN.match(normalized) else normalized
+
+def format_birth_date(value) -> str:
+    """Format a stored birth date as DD.MM.YYYY (legacy, not yet migrated values are parsed once and memoized)"""
+    if not value:
+        return ""
+    if isinstance(value, str) and len(value) == 10 and value[4] == "-" and value[7] == "-":
+        return f"{value[8:10]}.{value[5:7]}.{value[0:4]}"
+    return _format_legacy_birth_date(str(value))
+
+def student_fields_from_row(row: Dict[str, str]) -> dict:
+    """Student model fields of a projected spreadsheet row (birth date normalized)"""
+    fields = {field: row[column] for column, field in STUDENT_COLUMNS.items()}
+    fields["sus_geb"] = normalize_birth_date(fields["sus_geb"])
+    return fields
+
+def read_spreadsheet_rows(contents: bytes, filename: str, columns: List[str]) -> Tuple[set, Iterator[Tuple[int, Dict[str, str]]]]:
+    """
+    Stream the rows of the first worksheet, projected onto `columns`.
+    
+    Header names are matched case-insensitively. Returns the set of requested
+    columns present in the sheet and a generator of (excel_row_number, row)
+    where row maps every requested column to a string ('' if empty/missing).
+    .xlsx files are read with openpyxl in read-only mode, legacy .xls files
+    fall back to pandas/xlrd with all columns read as strings.
+    """
+    wanted = [c.lower() for c in columns]
+    
+    if filename.lower().endswith('.xls'):
+        df = pd.read_excel(
+            io.BytesIO(contents),
+            engine='xlrd',
+            dtype=str,
+            usecols=lambda c: str(c).strip().lower() in wanted
+        )
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        df = df.fillna('').apply(lambda col: col.str.strip())
+        present = set(df.columns)
+        
+        def xls_rows():
+            for idx, values in zip(df.index, df.itertuples(index=False, name=None)):
+                row = dict.fromkeys(wanted, '')
+                row.update((col, '' if val.lower() == 'nan' else val) for col, val in zip(df.columns, values))
+                yield idx + 2, row
+        
+        return present, xls_rows()
+    
+    workbook = load_workbook(io.BytesIO(contents), read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    positions = {}
+    for pos, name in enumerate(header):
+        key = str(name).strip().lower() if name is not None else ''
+        if key in wanted and key not in positions:
+            positions[key] = pos
+    
+    def xlsx_rows():
+        try:
+            for row_number, values in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+                if not any(v is not None and v != '' for v in values):
+                    continue  # Blank row
+                row = dict.fromkeys(wanted, '')
+                for key, pos in positions.items():
+                    if pos < len(values):
+                        row[key] = cell_to_str(values[pos])
+                yield row_number, row
+        finally:
+            workbook.close()
+    
+    return set(positions), xlsx_rows()
+
 # Authentication endpoints
 @api_router.post("/auth/setup", response_model=dict)
 async def setup_admin():
@@ -379,10 +1033,11 @@ async def setup_admin():
                 {"username": "admin"},
                 {"$set": {"role": "admin", "is_active": True}}
             )
+            user_cache.invalidate(existing_user.get("id"))
             return {"message": "Admin user updated with role"}
         return {"message": "Admin user already exists"}
     
-    hashed_password = get_password_hash("admin123")
+    hashed_password = await get_password_hash_async("admin123")
     user = User(username="admin", password_hash=hashed_password, role="admin", is_active=True)
     user_dict = prepare_for_mongo(user.dict())
     await db.users.insert_one(user_dict)
@@ -409,18 +1064,19 @@ async def change_password(
             raise HTTPException(status_code=404, detail="User not found")
         
         # Verify current password
-        if not verify_password(current_password, user["password_hash"]):
+        if not await verify_password_async(current_password, user["password_hash"]):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
         
         # Update password
-        hashed_new_password = get_password_hash(new_password)
+        hashed_new_password = await get_password_hash_async(new_password)
         await db.users.update_one(
             {"username": current_user},
             {"$set": {
                 "password_hash": hashed_new_password,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
+        user_cache.invalidate(current_user["id"])
         
         return {"message": "Password changed successfully"}
         
@@ -456,7 +1112,7 @@ async def change_username(
             raise HTTPException(status_code=404, detail="User not found")
         
         # Verify current password
-        if not verify_password(current_password, user["password_hash"]):
+        if not await verify_password_async(current_password, user["password_hash"]):
             raise HTTPException(status_code=400, detail="Current password is incorrect")
         
         # Update username
@@ -464,9 +1120,10 @@ async def change_username(
             {"username": current_user},
             {"$set": {
                 "username": new_username,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
+        user_cache.invalidate(current_user["id"])
         
         return {"message": "Username changed successfully", "new_username": new_username}
         
@@ -496,15 +1153,16 @@ async def change_password_forced(
             raise HTTPException(status_code=404, detail="User not found")
         
         # Update password and clear force_password_change flag
-        hashed_new_password = get_password_hash(new_password)
+        hashed_new_password = await get_password_hash_async(new_password)
         await db.users.update_one(
             {"id": current_user["id"]},
             {"$set": {
                 "password_hash": hashed_new_password,
                 "force_password_change": False,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
+        user_cache.invalidate(current_user["id"])
         
         return {"message": "Password changed successfully. You can now use your new password to login."}
         
@@ -518,7 +1176,7 @@ async def change_password_forced(
 @limiter.limit("5/minute")  # Max 5 login attempts per minute
 async def login(request: Request, user_data: UserLogin):
     user = await db.users.find_one({"username": user_data.username})
-    if not user or not verify_password(user_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(user_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Check if user is active
@@ -563,7 +1221,7 @@ async def create_user(user_data: UserCreate, current_user: dict = Depends(get_cu
         raise HTTPException(status_code=400, detail="Role must be 'admin' or 'user'")
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         username=user_data.username,
         password_hash=hashed_password,
@@ -602,8 +1260,8 @@ async def list_users(current_user: dict = Depends(get_current_user)):
             is_active=user.get("is_active", True),
             force_password_change=user.get("force_password_change", False),
             created_by=user.get("created_by"),
-            created_at=datetime.fromisoformat(user["created_at"]) if isinstance(user["created_at"], str) else user["created_at"],
-            updated_at=datetime.fromisoformat(user["updated_at"]) if isinstance(user.get("updated_at"), str) else user.get("updated_at", user["created_at"])
+            created_at=user["created_at"],
+            updated_at=user.get("updated_at", user["created_at"])
         )
         for user in users
     ]
@@ -627,12 +1285,12 @@ async def update_user(
         raise HTTPException(status_code=400, detail="Cannot deactivate your own account")
     
     # Build update dict
-    update_dict = {"updated_at": datetime.now(timezone.utc).isoformat()}
+    update_dict = {"updated_at": datetime.now(timezone.utc)}
     
     if user_data.password:
         if len(user_data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters long")
-        update_dict["password_hash"] = get_password_hash(user_data.password)
+        update_dict["password_hash"] = await get_password_hash_async(user_data.password)
     
     if user_data.role:
         if user_data.role not in ["admin", "user"]:
@@ -647,6 +1305,7 @@ async def update_user(
         {"id": user_id},
         {"$set": update_dict}
     )
+    user_cache.invalidate(user_id)
     
     # Get updated user
     updated_user = await db.users.find_one({"id": user_id})
@@ -658,8 +1317,8 @@ async def update_user(
         is_active=updated_user.get("is_active", True),
         force_password_change=updated_user.get("force_password_change", False),
         created_by=updated_user.get("created_by"),
-        created_at=datetime.fromisoformat(updated_user["created_at"]) if isinstance(updated_user["created_at"], str) else updated_user["created_at"],
-        updated_at=datetime.fromisoformat(updated_user["updated_at"]) if isinstance(updated_user.get("updated_at"), str) else updated_user.get("updated_at", updated_user["created_at"])
+        created_at=updated_user["created_at"],
+        updated_at=updated_user.get("updated_at", updated_user["created_at"])
     )
 
 @api_router.delete("/admin/users/{user_id}")
@@ -682,9 +1341,10 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
         {"id": user_id},
         {"$set": {
             "is_active": False,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
+    user_cache.invalidate(user_id)
     
     # Count user's resources
     ipads_count = await db.ipads.count_documents({"user_id": user_id})
@@ -733,7 +1393,7 @@ async def delete_user_complete(user_id: str, current_user: dict = Depends(get_cu
         await db.assignments.delete_many({"user_id": user_id})
         
         # Delete contracts
-        await db.contracts.delete_many({"user_id": user_id})
+        await delete_contracts({"user_id": user_id})
         
         # Delete iPads
         await db.ipads.delete_many({"user_id": user_id})
@@ -743,6 +1403,9 @@ async def delete_user_complete(user_id: str, current_user: dict = Depends(get_cu
         
         # Finally, delete the user account
         await db.users.delete_one({"id": user_id})
+        user_cache.invalidate(user_id)
+        
+        await bump_data_version(user_id)
         
         return {
             "message": f"User '{target_user['username']}' and all associated data have been permanently deleted",
@@ -792,14 +1455,16 @@ async def cleanup_orphaned_data(current_user: dict = Depends(get_current_user)):
         orphaned_assignments = [a for a in all_assignments if a["user_id"] not in existing_user_ids]
         
         # Find orphaned Contracts
-        all_contracts = await db.contracts.find({}, {"id": 1, "user_id": 1}).to_list(length=None)
+        all_contracts = await find_contract_metadata({}, fields=["id", "user_id"])
         orphaned_contracts = [c for c in all_contracts if c["user_id"] not in existing_user_ids]
         
         # Delete orphaned data
         deleted_ipads = await db.ipads.delete_many({"id": {"$in": orphaned_ipad_ids}})
         deleted_students = await db.students.delete_many({"id": {"$in": orphaned_student_ids}})
         deleted_assignments = await db.assignments.delete_many({"user_id": {"$nin": list(existing_user_ids)}})
-        deleted_contracts = await db.contracts.delete_many({"user_id": {"$nin": list(existing_user_ids)}})
+        deleted_contracts = await delete_contracts({"user_id": {"$nin": list(existing_user_ids)}})
+        
+        await bump_data_version(None)
         
         return {
             "message": "Orphaned data cleanup completed",
@@ -841,7 +1506,7 @@ async def reset_user_password(user_id: str, current_user: dict = Depends(get_cur
     temp_password = ''.join([str(random.randint(0, 9)) for _ in range(8)])
     
     # Hash the temporary password
-    hashed_temp_password = get_password_hash(temp_password)
+    hashed_temp_password = await get_password_hash_async(temp_password)
     
     # Update user with temporary password and set force_password_change flag
     await db.users.update_one(
@@ -849,9 +1514,10 @@ async def reset_user_password(user_id: str, current_user: dict = Depends(get_cur
         {"$set": {
             "password_hash": hashed_temp_password,
             "force_password_change": True,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
+    user_cache.invalidate(user_id)
     
     return {
         "message": f"Password for user '{target_user['username']}' has been reset",
@@ -861,9 +1527,521 @@ async def reset_user_password(user_id: str, current_user: dict = Depends(get_cur
     }
 
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counters of the in-process caches (admin only)"""
+    require_admin(current_user)
+    
+    return {
+        "users": user_cache.stats(),
+        "exports": export_cache.stats()
+    }
+
+def metrics_client_is_internal(request: Request) -> bool:
+    """Direct connection from an allowed network (requests relayed by nginx carry X-Forwarded-For/X-Real-IP)"""
+    if request.headers.get("x-forwarded-for") or request.headers.get("x-real-ip"):
+        return False
+    if request.client is None:
+        return False
+    try:
+        address = ipaddress.ip_address(request.client.host)
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_NETWORKS)
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics(request: Request):
+    """
+    Prometheus scrape endpoint. Allowed with `Authorization: Bearer <METRICS_TOKEN>`,
+    an admin JWT, or from an internal network without proxy headers.
+    """
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else ""
+    
+    allowed = bool(METRICS_TOKEN) and secrets.compare_digest(token, METRICS_TOKEN)
+    if not allowed and token:
+        try:
+            user = await get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+            allowed = user.get("role") == "admin"
+        except HTTPException:
+            allowed = False
+    if not allowed:
+        allowed = metrics_client_is_internal(request)
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Metrics are only available to admins and internal networks")
+    
+    return PlainTextResponse(http_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api_router.get("/health", include_in_schema=False)
+async def health():
+    """Liveness/readiness probe for the container healthcheck"""
+    try:
+        await db.command("ping")
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {str(e)}")
+    return {"status": "ok"}
+
+@api_router.get("/admin/metrics/db")
+async def get_db_metrics(reset: bool = False, current_user: dict = Depends(get_current_user)):
+    """Per-route DB round trips and latency (admin only), N+1 suspects first"""
+    require_admin(current_user)
+    
+    routes = db_route_metrics.snapshot()
+    if reset:
+        db_route_metrics.reset()
+    return {"routes": routes}
+
+
+# Background jobs
+# Long imports run as in-process asyncio tasks. Their state (including the
+# uploaded file until the job finishes) lives in the `jobs` collection, so a
+# restarted worker can pick up queued/running jobs and continue after the last
+# persisted chunk. The worker running a job renews its heartbeat_at; other
+# workers only take over jobs whose heartbeat is older than JOB_STALE_SECONDS.
+JOB_CHUNK_SIZE = max(1, int(os.environ.get("JOB_CHUNK_SIZE", "500")))
+JOB_ACTIVE_STATUSES = ["queued", "running"]
+JOB_HEARTBEAT_SECONDS = max(1, int(os.environ.get("JOB_HEARTBEAT_SECONDS", "15")))
+JOB_STALE_SECONDS = max(JOB_HEARTBEAT_SECONDS * 2, int(os.environ.get("JOB_STALE_SECONDS", "120")))
+# Finished jobs (with their result details) are removed by a TTL index on finished_at
+JOB_RETENTION_DAYS = max(1, int(os.environ.get("JOB_RETENTION_DAYS", "7")))
+WORKER_ID = str(uuid.uuid4())
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once cancellation was requested"""
+
+class JobProgress:
+    """Progress handle passed to job handlers; update() persists a finished chunk"""
+    
+    def __init__(self, job_id: str, rows_done: int = 0, result: Optional[dict] = None):
+        self.job_id = job_id
+        self.rows_done = rows_done
+        self.result = result
+    
+    async def update(self, rows_done: int, result: dict, total_rows: Optional[int] = None):
+        self.rows_done = rows_done
+        self.result = result
+        now = datetime.now(timezone.utc)
+        update = {
+            "rows_done": rows_done,
+            "error_count": result.get("error_count", 0),
+            "errors": result.get("errors", [])[:10],
+            "result": result,
+            "updated_at": now,
+            "heartbeat_at": now
+        }
+        if total_rows is not None:
+            update["total_rows"] = total_rows
+        
+        job = await db.jobs.find_one_and_update(
+            {"id": self.job_id, "worker_id": WORKER_ID},
+            {"$set": update},
+            projection={"_id": 0, "cancel_requested": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            # Another worker took the job over (our heartbeat went stale), stop here
+            raise JobCancelled()
+        if job.get("cancel_requested") or job_runner.is_cancelled(self.job_id):
+            raise JobCancelled()
+
+def public_job(job: dict) -> dict:
+    """Job document without the stored upload"""
+    return {key: value for key, value in job.items() if key not in ("_id", "file_data")}
+
+class JobRunner:
+    def __init__(self, handlers: Dict[str, Any]):
+        self.handlers = handlers
+        self._tasks = {}
+        self._cancelled = set()
+        self._maintenance_task = None
+    
+    async def submit(self, job_type: str, user: dict, filename: str, contents: bytes, options: Optional[dict] = None) -> dict:
+        """Persist a new job and start it in the background"""
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user["id"],
+            "type": job_type,
+            "filename": filename,
+            "options": options or {},
+            "status": "queued",
+            "rows_done": 0,
+            "total_rows": None,
+            "error_count": 0,
+            "errors": [],
+            "result": None,
+            "cancel_requested": False,
+            "worker_id": WORKER_ID,
+            "heartbeat_at": now,
+            "file_data": contents,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        await db.jobs.insert_one(job)
+        self._start(job)
+        return public_job(job)
+    
+    def _start(self, job: dict):
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+    
+    async def _run(self, job: dict):
+        progress = JobProgress(job["id"], job.get("rows_done", 0), job.get("result"))
+        update = {}
+        try:
+            await db.jobs.update_one(
+                {"id": job["id"], "worker_id": WORKER_ID},
+                {"$set": {"status": "running", "updated_at": datetime.now(timezone.utc)}}
+            )
+            result = await self.handlers[job["type"]](job, progress)
+            update = {"status": "completed", "result": result, "error_count": result.get("error_count", 0)}
+        except JobCancelled:
+            update = {"status": "cancelled"}
+        except Exception as e:
+            print(f"Job {job['id']} ({job['type']}) failed: {e}")
+            update = {"status": "failed", "error": str(e)}
+        finally:
+            self._cancelled.discard(job["id"])
+            now = datetime.now(timezone.utc)
+            # Only while we still own the job, a worker that took it over finishes it
+            await db.jobs.update_one(
+                {"id": job["id"], "worker_id": WORKER_ID},
+                {"$set": {**update, "finished_at": now, "updated_at": now}, "$unset": {"file_data": ""}}
+            )
+    
+    def is_cancelled(self, job_id: str) -> bool:
+        return job_id in self._cancelled
+    
+    async def cancel(self, job: dict):
+        """Request cancellation; the handler stops after its current chunk"""
+        now = datetime.now(timezone.utc)
+        if job["id"] in self._tasks:
+            self._cancelled.add(job["id"])
+        await db.jobs.update_one(
+            {"id": job["id"], "status": {"$in": JOB_ACTIVE_STATUSES}},
+            {"$set": {"cancel_requested": True, "updated_at": now}}
+        )
+        if job["status"] == "queued" and job["id"] not in self._tasks:
+            # Nobody is working on it (yet), finish it right away
+            await db.jobs.update_one(
+                {"id": job["id"], "status": "queued"},
+                {"$set": {"status": "cancelled", "finished_at": now}, "$unset": {"file_data": ""}}
+            )
+    
+    async def heartbeat(self):
+        """Renew the heartbeat of the jobs this worker is running"""
+        if self._tasks:
+            await db.jobs.update_many(
+                {"id": {"$in": list(self._tasks)}, "worker_id": WORKER_ID},
+                {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+            )
+    
+    async def resume_pending(self):
+        """Claim and restart jobs that were queued or running when a worker stopped"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+        pending = await db.jobs.find(
+            {"status": {"$in": JOB_ACTIVE_STATUSES},
+             "$or": [{"heartbeat_at": {"$lt": cutoff}}, {"heartbeat_at": None}]},
+            {"_id": 0, "id": 1, "worker_id": 1, "heartbeat_at": 1}
+        ).to_list(length=None)
+        
+        for stale in pending:
+            # Compare-and-swap on worker_id and heartbeat so only one worker resumes a
+            # job, and only if its owner did not renew the heartbeat in the meantime
+            now = datetime.now(timezone.utc)
+            job = await db.jobs.find_one_and_update(
+                {"id": stale["id"], "worker_id": stale.get("worker_id"), "heartbeat_at": stale.get("heartbeat_at"),
+                 "status": {"$in": JOB_ACTIVE_STATUSES}},
+                {"$set": {"worker_id": WORKER_ID, "heartbeat_at": now, "updated_at": now}},
+                return_document=ReturnDocument.AFTER
+            )
+            if not job or job["id"] in self._tasks:
+                continue
+            if job.get("cancel_requested") or job.get("file_data") is None:
+                await db.jobs.update_one(
+                    {"id": job["id"]},
+                    {"$set": {"status": "cancelled" if job.get("cancel_requested") else "failed",
+                              "finished_at": datetime.now(timezone.utc)},
+                     "$unset": {"file_data": ""}}
+                )
+                continue
+            self._start(job)
+    
+    async def _maintain(self):
+        while True:
+            try:
+                await self.heartbeat()
+                await self.resume_pending()
+            except Exception as e:
+                print(f"Warning: Job maintenance failed: {e}")
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+    
+    def start_maintenance(self):
+        """Keep the own heartbeats fresh and take over jobs of workers that stopped"""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintain())
+    
+    def stop_maintenance(self):
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+
+job_runner = JobRunner({
+    "ipads_upload": lambda job, progress: ingest_ipads(job["file_data"], job["user_id"], progress),
+    "students_upload": lambda job, progress: ingest_students(job["file_data"], job["filename"], job["user_id"], progress),
+    "inventory_import": lambda job, progress: ingest_inventory(
+        job["file_data"], job["filename"], job["user_id"], job.get("options", {}).get("dry_run", False), progress
+    )
+})
+
+async def get_job_for_user(job_id: str, user: dict) -> dict:
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0, "file_data": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not is_admin(user) and job.get("user_id") != user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied to this resource")
+    return job
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Status and progress (rows done, errors so far) of a background job"""
+    return await get_job_for_user(job_id, current_user)
+
+@api_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Cancel a background job. Chunks that were already written are kept."""
+    job = await get_job_for_user(job_id, current_user)
+    if job["status"] not in JOB_ACTIVE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Job is already {job['status']}")
+    
+    await job_runner.cancel(job)
+    return {"message": "Cancellation requested", "job_id": job_id}
+
+
+# Keyset pagination
+# List endpoints accept ?limit=&after=<cursor>. Rows are sorted by stable keys
+# (unique id as tie breaker) using German collation so umlauts sort correctly,
+# and the next page continues after the last key instead of skipping rows.
+PAGINATION_MAX_LIMIT = 1000
+GERMAN_COLLATION = {"locale": "de"}
+PAGINATION_SORT_KEYS = {
+    "ipads": ["itnr", "id"],
+    "students": ["sus_kl", "sus_nachn", "sus_vorn", "id"],
+    "assignments": ["itnr", "id"],
+}
+
+def encode_cursor(doc: dict, keys: List[str]) -> str:
+    """Opaque cursor holding the sort key values of the last returned row"""
+    raw = json.dumps([doc.get(key) for key in keys], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, keys: List[str]) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+def keyset_filter(keys: List[str], values: list) -> dict:
+    """Rows sorting after `values` for an ascending sort on `keys`"""
+    clauses = []
+    for position, key in enumerate(keys):
+        clause = {previous: values[index] for index, previous in enumerate(keys[:position])}
+        # null sorts first but $gt: null matches nothing (type bracketing)
+        clause[key] = {"$gt": values[position]} if values[position] is not None else {"$ne": None}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+async def estimate_total(collection, query: dict, collation: Optional[dict] = GERMAN_COLLATION) -> int:
+    if not query:
+        return await collection.estimated_document_count()
+    if collation is None:
+        return await collection.count_documents(query)
+    return await collection.count_documents(query, collation=collation)
+
+async def find_page(collection, query: dict, keys: List[str], limit: Optional[int],
+                    after: Optional[str], response: Response, projection: Optional[dict] = None,
+                    collation: Optional[dict] = GERMAN_COLLATION) -> List[dict]:
+    """
+    Sorted find with optional keyset pagination. With a limit the response gets
+    X-Next-Cursor (only if there are more rows); the first page (no `after`)
+    also X-Total-Count (estimated), follow-up pages skip the count. Without a
+    limit all rows are returned, as before. A projection has to keep
+    the sort keys. Queries on search keys pass collation=None: their indexes
+    use the simple collation (binary prefix matches), every page of such a
+    listing is then sorted and compared without collation as well.
+    """
+    page_query = query
+    if after:
+        page_query = {"$and": [query, keyset_filter(keys, decode_cursor(after, keys))]}
+    cursor = collection.find(page_query, projection or {"_id": 0}).sort([(key, 1) for key in keys])
+    if collation is not None:
+        cursor = cursor.collation(collation)
+    if limit is None:
+        return await cursor.to_list(length=None)
+    
+    docs = await cursor.limit(limit + 1).to_list(length=limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], keys)
+    if not after:
+        response.headers["X-Total-Count"] = str(await estimate_total(collection, query, collation))
+    return docs
+
+# Fast JSON path for list endpoints
+# Rows of the big lists were written through the models, so they are not
+# validated again: the projection drops internal fields (search keys), missing
+# optional fields get the model default and orjson renders the dicts directly.
+# Building a model per row plus FastAPI's re-validation through response_model
+# cost more CPU than the query itself on large lists.
+@functools.lru_cache(maxsize=None)
+def model_list_projection(model) -> Dict[str, int]:
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+@functools.lru_cache(maxsize=None)
+def model_list_defaults(model) -> Dict[str, Any]:
+    """Static defaults of the optional fields (default factories only apply to new objects)"""
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+def model_list_response(model, rows: List[dict], response: Response) -> ORJSONResponse:
+    """
+    JSON list of trusted DB rows shaped like `model` (documented via response_model).
+    FastAPI ignores the injected `response` once a Response is returned, so the
+    pagination headers are carried over.
+    """
+    defaults = model_list_defaults(model)
+    headers = {name: response.headers[name] for name in ("X-Next-Cursor", "X-Total-Count") if name in response.headers}
+    return ORJSONResponse([{**defaults, **row} for row in rows], headers=headers)
+
+
 # iPad management endpoints
+def plan_ipad_upload(df: pd.DataFrame, user_id: str, existing_itnrs: set):
+    """
+    Decide for every row of an iPad sheet whether it is inserted or skipped.
+    
+    Validation and duplicate detection run vectorized on the DataFrame; the
+    returned `details` keep the row order of the sheet. `insert_positions[i]`
+    is the index in `details` that belongs to `ipad_docs[i]`.
+    """
+    itnrs = df['itnr'].astype(str)
+    snrs = df['snr'].astype(str)
+    missing = itnrs.isin(['', 'nan']) | snrs.isin(['', 'nan'])
+    already_stored = ~missing & itnrs.isin(existing_itnrs)
+    # Only the first occurrence of an ITNr inside the file is inserted
+    duplicate_in_file = ~missing & ~already_stored & itnrs.duplicated(keep='first')
+    skip_existing = already_stored | duplicate_in_file
+    
+    def optional_column(name):
+        return df[name].astype(str) if name in df.columns else pd.Series('', index=df.index)
+    
+    karton = optional_column('karton')
+    pencil = optional_column('pencil')
+    typ = optional_column('typ')
+    ansch_jahr = optional_column('anschjahr')
+    ausleihe_datum = optional_column('ausleihedatum')
+    
+    ipad_docs = []
+    insert_positions = []
+    details = []
+    skipped_count = int(missing.sum() + skip_existing.sum())
+    
+    for pos, idx in enumerate(df.index):
+        itnr = itnrs.iat[pos]
+        if missing.iat[pos]:
+            details.append(f"Row {idx+2}: Missing ITNr or SNr - skipped")
+            continue
+        if skip_existing.iat[pos]:
+            details.append(f"iPad {itnr} already exists - skipped")
+            continue
+        
+        ipad = iPad(
+            user_id=user_id,
+            itnr=itnr,
+            snr=snrs.iat[pos],
+            karton=karton.iat[pos],
+            pencil=pencil.iat[pos],
+            typ=typ.iat[pos],
+            ansch_jahr=ansch_jahr.iat[pos],
+            ausleihe_datum=ausleihe_datum.iat[pos]
+        )
+        ipad_docs.append(prepare_for_mongo(ipad.dict()))
+        insert_positions.append(len(details))
+        details.append(f"iPad {itnr} (SNr: {ipad.snr}) added successfully")
+    
+    return ipad_docs, insert_positions, details, skipped_count
+
+async def ingest_ipads(contents: bytes, user_id: str, progress: Optional["JobProgress"] = None) -> dict:
+    """
+    Insert the iPads of an upload sheet. Returns the UploadResponse fields.
+    
+    Without `progress` the whole sheet is one chunk. As a background job the
+    sheet is written in chunks of JOB_CHUNK_SIZE rows, progress is persisted
+    after every chunk and a resumed job continues after `progress.rows_done`.
+    """
+    df = pd.read_excel(io.BytesIO(contents))
+    # Normalize column names to lowercase for case-insensitive matching
+    df.columns = df.columns.str.lower()
+    
+    result = {"processed_count": 0, "skipped_count": 0, "error_count": 0, "details": []}
+    if progress and progress.result:
+        result.update(progress.result)
+    start_row = progress.rows_done if progress else 0
+    chunk_size = JOB_CHUNK_SIZE if progress else max(len(df), 1)
+    
+    # Prefetch all ITNrs of this sheet that the user already has (users can have same ITNr)
+    sheet_itnrs = df['itnr'].astype(str).unique().tolist()
+    existing = await db.ipads.find(
+        {"user_id": user_id, "itnr": {"$in": sheet_itnrs}},
+        {"_id": 0, "itnr": 1}
+    ).to_list(length=None)
+    existing_itnrs = {ipad["itnr"] for ipad in existing}
+    
+    for offset in range(start_row, len(df), chunk_size):
+        chunk = df.iloc[offset:offset + chunk_size]
+        ipad_docs, insert_positions, details, skipped_count = plan_ipad_upload(chunk, user_id, existing_itnrs)
+        # Later chunks must see the ITNrs of this one as existing
+        existing_itnrs.update(doc["itnr"] for doc in ipad_docs)
+        processed_count = len(ipad_docs)
+        
+        if ipad_docs:
+            try:
+                await db.ipads.insert_many(ipad_docs, ordered=False)
+            except BulkWriteError as e:
+                # Unordered insert: everything except the reported documents was written
+                for write_error in e.details.get("writeErrors", []):
+                    doc = ipad_docs[write_error["index"]]
+                    details[insert_positions[write_error["index"]]] = f"iPad {doc['itnr']} could not be saved - skipped"
+                    processed_count -= 1
+                    skipped_count += 1
+                    result["error_count"] += 1
+        
+        if processed_count:
+            await bump_data_version(user_id)
+        result["processed_count"] += processed_count
+        result["skipped_count"] += skipped_count
+        result["details"].extend(details)
+        if progress:
+            await progress.update(offset + len(chunk), result, total_rows=len(df))
+    
+    result["message"] = f"Processed {result['processed_count']} iPads, skipped {result['skipped_count']}"
+    return result
+
 @api_router.post("/ipads/upload", response_model=UploadResponse)
-async def upload_ipads(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+async def upload_ipads(
+    file: UploadFile = File(...),
+    background: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Upload iPads from Excel. With background=true a job id is returned at once (see /jobs/{job_id})"""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Only .xlsx files are allowed")
     
@@ -871,63 +2049,23 @@ async def upload_ipads(file: UploadFile = File(...), current_user: dict = Depend
         contents = await file.read()
         # Security: Validate uploaded file
         validate_uploaded_file(contents, file.filename, max_size_mb=5, allowed_types=['.xlsx'])
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        # Normalize column names to lowercase for case-insensitive matching
-        df.columns = df.columns.str.lower()
         
         # Check if required columns exist
         required_columns = ['itnr', 'snr']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        present_columns, _ = read_spreadsheet_rows(contents, file.filename, required_columns)
+        missing_columns = [col for col in required_columns if col not in present_columns]
         if missing_columns:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Missing required columns: {', '.join(missing_columns)}. Required: ITNr, SNr (case-insensitive)"
             )
         
-        processed_count = 0
-        skipped_count = 0
-        details = []
+        if background:
+            job = await job_runner.submit("ipads_upload", current_user, file.filename, contents)
+            return JSONResponse(status_code=202, content=jsonable_encoder(job))
         
-        for idx, row in df.iterrows():
-            itnr = str(row.get('itnr', ''))
-            snr = str(row.get('snr', ''))
-            
-            # Validate required fields
-            if not itnr or itnr == 'nan' or not snr or snr == 'nan':
-                skipped_count += 1
-                details.append(f"Row {idx+2}: Missing ITNr or SNr - skipped")
-                continue
-                
-            # Check if iPad already exists for this user (users can have same ITNr)
-            existing = await db.ipads.find_one({"itnr": itnr, "user_id": current_user["id"]})
-            if existing:
-                skipped_count += 1
-                details.append(f"iPad {itnr} already exists - skipped")
-                continue
-            
-            ipad = iPad(
-                user_id=current_user["id"],
-                itnr=itnr,
-                snr=snr,
-                karton=str(row.get('karton', '')),
-                pencil=str(row.get('pencil', '')),
-                typ=str(row.get('typ', '')),
-                ansch_jahr=str(row.get('anschjahr', '')),
-                ausleihe_datum=str(row.get('ausleihedatum', ''))
-            )
-            
-            ipad_dict = prepare_for_mongo(ipad.dict())
-            await db.ipads.insert_one(ipad_dict)
-            processed_count += 1
-            details.append(f"iPad {itnr} (SNr: {snr}) added successfully")
-        
-        return UploadResponse(
-            message=f"Processed {processed_count} iPads, skipped {skipped_count}",
-            processed_count=processed_count,
-            skipped_count=skipped_count,
-            details=details
-        )
+        result = await ingest_ipads(contents, current_user["id"])
+        return UploadResponse(**result)
         
     except HTTPException:
         raise
@@ -935,11 +2073,17 @@ async def upload_ipads(file: UploadFile = File(...), current_user: dict = Depend
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @api_router.get("/ipads", response_model=List[iPad])
-async def get_ipads(current_user: dict = Depends(get_current_user)):
+async def get_ipads(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGINATION_MAX_LIMIT),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     # Apply user filter
     user_filter = await get_user_filter(current_user)
-    ipads = await db.ipads.find(user_filter).to_list(length=None)
-    return [iPad(**parse_from_mongo(ipad)) for ipad in ipads]
+    ipads = await find_page(db.ipads, user_filter, PAGINATION_SORT_KEYS["ipads"], limit, after, response,
+                            projection=model_list_projection(iPad))
+    return model_list_response(iPad, ipads, response)
 
 
 @api_router.delete("/ipads/{ipad_id}")
@@ -966,11 +2110,13 @@ async def delete_ipad(ipad_id: str, current_user: dict = Depends(get_current_use
     assignments_result = await db.assignments.delete_many({"ipad_id": ipad_id})
     
     # Delete all contracts for this iPad
-    contracts_result = await db.contracts.delete_many({"itnr": ipad["itnr"]})
+    contracts_result = await delete_contracts({"itnr": ipad["itnr"]})
     
     # Delete the iPad
     await db.ipads.delete_one({"id": ipad_id})
     
+    await bump_data_version(ipad.get("user_id"))
+    
     return {
         "message": f"iPad {ipad['itnr']} erfolgreich gelöscht",
         "deleted_assignments": assignments_result.deleted_count,
@@ -979,8 +2125,100 @@ async def delete_ipad(ipad_id: str, current_user: dict = Depends(get_current_use
 
 
 # Student management endpoints
+def plan_student_upload(rows, user_id: str, existing_names: set):
+    """
+    Build the student documents and row details for a chunk of (row_number, row)
+    tuples. `insert_positions[i]` is the index in `details` of `student_docs[i]`.
+    """
+    student_docs = []
+    insert_positions = []
+    details = []
+    skipped_count = 0
+    
+    for row_number, row in rows:
+        sus_vorn = row['susvorn']
+        sus_nachn = row['susnachn']
+        
+        # Validate required fields
+        if not sus_vorn or not sus_nachn:
+            skipped_count += 1
+            details.append(f"Row {row_number}: Missing SuSVorn or SuSNachn - skipped")
+            continue
+        
+        # Check if student already exists for this user (by name combination)
+        if (sus_vorn, sus_nachn) in existing_names:
+            skipped_count += 1
+            details.append(f"Student {sus_vorn} {sus_nachn} already exists - skipped")
+            continue
+        
+        student = Student(
+            user_id=user_id,
+            **student_fields_from_row(row)
+        )
+        student_docs.append(prepare_for_mongo(student.dict()))
+        existing_names.add((sus_vorn, sus_nachn))
+        insert_positions.append(len(details))
+        details.append(f"Student {sus_vorn} {sus_nachn} added successfully")
+    
+    return student_docs, insert_positions, details, skipped_count
+
+async def ingest_students(contents: bytes, filename: str, user_id: str, progress: Optional["JobProgress"] = None) -> dict:
+    """Insert the students of an upload sheet chunk by chunk. Returns the UploadResponse fields."""
+    _, rows = read_spreadsheet_rows(contents, filename, list(STUDENT_COLUMNS))
+    
+    result = {"processed_count": 0, "skipped_count": 0, "error_count": 0, "details": []}
+    if progress and progress.result:
+        result.update(progress.result)
+    rows_done = progress.rows_done if progress else 0
+    if rows_done:
+        rows = itertools.islice(rows, rows_done, None)
+    
+    existing = await db.students.find(
+        {"user_id": user_id},
+        {"_id": 0, "sus_vorn": 1, "sus_nachn": 1}
+    ).to_list(length=None)
+    existing_names = {(s.get("sus_vorn"), s.get("sus_nachn")) for s in existing}
+    
+    while True:
+        chunk = list(itertools.islice(rows, JOB_CHUNK_SIZE))
+        if not chunk:
+            break
+        student_docs, insert_positions, details, skipped_count = plan_student_upload(chunk, user_id, existing_names)
+        processed_count = len(student_docs)
+        
+        if student_docs:
+            try:
+                await db.students.insert_many(student_docs, ordered=False)
+            except BulkWriteError as e:
+                # Unordered insert: everything except the reported documents was written
+                for write_error in e.details.get("writeErrors", []):
+                    doc = student_docs[write_error["index"]]
+                    details[insert_positions[write_error["index"]]] = (
+                        f"Student {doc['sus_vorn']} {doc['sus_nachn']} could not be saved - skipped"
+                    )
+                    processed_count -= 1
+                    skipped_count += 1
+                    result["error_count"] += 1
+        
+        rows_done += len(chunk)
+        if processed_count:
+            await bump_data_version(user_id)
+        result["processed_count"] += processed_count
+        result["skipped_count"] += skipped_count
+        result["details"].extend(details)
+        if progress:
+            await progress.update(rows_done, result)
+    
+    result["message"] = f"Processed {result['processed_count']} students, skipped {result['skipped_count']}"
+    return result
+
 @api_router.post("/students/upload", response_model=UploadResponse)
-async def upload_students(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+async def upload_students(
+    file: UploadFile = File(...),
+    background: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """Upload students from Excel. With background=true a job id is returned at once (see /jobs/{job_id})"""
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Only .xlsx files are allowed")
     
@@ -988,78 +2226,25 @@ async def upload_students(file: UploadFile = File(...), current_user: dict = Dep
         contents = await file.read()
         # Security: Validate uploaded file
         validate_uploaded_file(contents, file.filename, max_size_mb=5, allowed_types=['.xlsx'])
-        df = pd.read_excel(io.BytesIO(contents))
         
-        # Normalize column names to lowercase for case-insensitive matching
-        df.columns = df.columns.str.lower()
+        # Only the known student columns are read (case-insensitive), empty cells become ''
+        present_columns, _ = read_spreadsheet_rows(contents, file.filename, list(STUDENT_COLUMNS))
         
         # Check if required columns exist
         required_columns = ['susvorn', 'susnachn']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in present_columns]
         if missing_columns:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Missing required columns: {', '.join(missing_columns)}. Required: SuSVorn, SuSNachn (case-insensitive)"
             )
         
-        processed_count = 0
-        skipped_count = 0
-        details = []
+        if background:
+            job = await job_runner.submit("students_upload", current_user, file.filename, contents)
+            return JSONResponse(status_code=202, content=jsonable_encoder(job))
         
-        for idx, row in df.iterrows():
-            sus_vorn = str(row.get('susvorn', ''))
-            sus_nachn = str(row.get('susnachn', ''))
-            
-            # Validate required fields
-            if not sus_vorn or not sus_nachn or sus_vorn == 'nan' or sus_nachn == 'nan':
-                skipped_count += 1
-                details.append(f"Row {idx+2}: Missing SuSVorn or SuSNachn - skipped")
-                continue
-            
-            # Check if student already exists for this user (by name combination and user_id)
-            existing = await db.students.find_one({
-                "sus_vorn": sus_vorn,
-                "sus_nachn": sus_nachn,
-                "user_id": current_user["id"]
-            })
-            if existing:
-                skipped_count += 1
-                details.append(f"Student {sus_vorn} {sus_nachn} already exists - skipped")
-                continue
-            
-            student = Student(
-                user_id=current_user["id"],
-                sname=str(row.get('sname', '')),
-                sus_nachn=sus_nachn,
-                sus_vorn=sus_vorn,
-                sus_kl=str(row.get('suskl', '')),
-                sus_str_hnr=str(row.get('susstrhnr', '')),
-                sus_plz=str(row.get('susplz', '')),
-                sus_ort=str(row.get('susort', '')),
-                sus_geb=str(row.get('susgeb', '')),
-                erz1_nachn=str(row.get('erz1nachn', '')),
-                erz1_vorn=str(row.get('erz1vorn', '')),
-                erz1_str_hnr=str(row.get('erz1strhnr', '')),
-                erz1_plz=str(row.get('erz1plz', '')),
-                erz1_ort=str(row.get('erz1ort', '')),
-                erz2_nachn=str(row.get('erz2nachn', '')),
-                erz2_vorn=str(row.get('erz2vorn', '')),
-                erz2_str_hnr=str(row.get('erz2strhnr', '')),
-                erz2_plz=str(row.get('erz2plz', '')),
-                erz2_ort=str(row.get('erz2ort', ''))
-            )
-            
-            student_dict = prepare_for_mongo(student.dict())
-            await db.students.insert_one(student_dict)
-            processed_count += 1
-            details.append(f"Student {sus_vorn} {sus_nachn} added successfully")
-        
-        return UploadResponse(
-            message=f"Processed {processed_count} students, skipped {skipped_count}",
-            processed_count=processed_count,
-            skipped_count=skipped_count,
-            details=details
-        )
+        result = await ingest_students(contents, file.filename, current_user["id"])
+        return UploadResponse(**result)
         
     except HTTPException:
         raise
@@ -1067,11 +2252,17 @@ async def upload_students(file: UploadFile = File(...), current_user: dict = Dep
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 @api_router.get("/students", response_model=List[Student])
-async def get_students(current_user: dict = Depends(get_current_user)):
+async def get_students(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGINATION_MAX_LIMIT),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     # Apply user filter
     user_filter = await get_user_filter(current_user)
-    students = await db.students.find(user_filter).to_list(length=None)
-    return [Student(**parse_from_mongo(student)) for student in students]
+    students = await find_page(db.students, user_filter, PAGINATION_SORT_KEYS["students"], limit, after, response,
+                               projection=model_list_projection(Student))
+    return model_list_response(Student, students, response)
 
 @api_router.get("/students/available-for-assignment")
 async def get_available_students(current_user: dict = Depends(get_current_user)):
@@ -1107,31 +2298,24 @@ async def get_student_details(student_id: str, current_user: dict = Depends(get_
     assignment_history = await db.assignments.find({"student_id": student_id}).to_list(length=None)
     
     # Get contracts related to this student
-    contracts = await db.contracts.find({
+    contracts = await find_contract_metadata({
         "$or": [
-            {"student_name": {"$regex": f"{student['sus_vorn']} {student['sus_nachn']}", "$options": "i"}},
+            {"student_name": {"$regex": re.escape(f"{student['sus_vorn']} {student['sus_nachn']}"), "$options": "i"}},
             {"assignment_id": {"$in": [a["id"] for a in assignment_history]}}
         ]
-    }).to_list(length=None)
+    }, fields=["id", "assignment_id", "itnr", "student_name", "filename", "uploaded_at", "is_active"])
     
-    # Prepare contract data (without file_data for display)
+    # Prepare contract data (metadata only)
     contract_data = []
     for contract in contracts:
-        contract_dict = {
-            "id": contract.get("id"),
-            "assignment_id": contract.get("assignment_id"),
-            "itnr": contract.get("itnr"),
-            "student_name": contract.get("student_name"),
-            "filename": contract.get("filename"),
-            "uploaded_at": contract.get("uploaded_at"),
-            "is_active": contract.get("is_active", True)
-        }
+        contract_dict = contract_summary(contract)
+        contract_dict.pop("form_fields")
         contract_data.append(contract_dict)
     
     return {
-        "student": Student(**parse_from_mongo(student)),
-        "current_assignment": Assignment(**parse_from_mongo(current_assignment)) if current_assignment else None,
-        "assignment_history": [Assignment(**parse_from_mongo(a)) for a in assignment_history],
+        "student": Student(**student),
+        "current_assignment": Assignment(**current_assignment) if current_assignment else None,
+        "assignment_history": [Assignment(**a) for a in assignment_history],
         "contracts": contract_data
     }
 
@@ -1158,7 +2342,7 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
         if active_assignment.get("contract_id"):
             await db.contracts.update_one(
                 {"id": active_assignment["contract_id"]},
-                {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
+                {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc)}}
             )
         
         # Mark assignment as inactive
@@ -1166,8 +2350,8 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
             {"id": active_assignment["id"]},
             {"$set": {
                 "is_active": False,
-                "unassigned_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "unassigned_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         
@@ -1176,7 +2360,7 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
             {"id": active_assignment["ipad_id"]},
             {"$set": {
                 "current_assignment_id": None,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
     
@@ -1188,9 +2372,9 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
     all_assignments = await db.assignments.find({"student_id": student_id}).to_list(length=None)
     assignment_ids = [a["id"] for a in all_assignments]
     
-    contracts_result = await db.contracts.delete_many({
+    contracts_result = await delete_contracts({
         "$or": [
-            {"student_name": {"$regex": f"{student['sus_vorn']} {student['sus_nachn']}", "$options": "i"}},
+            {"student_name": {"$regex": re.escape(f"{student['sus_vorn']} {student['sus_nachn']}"), "$options": "i"}},
             {"assignment_id": {"$in": assignment_ids}}
         ]
     })
@@ -1198,6 +2382,8 @@ async def delete_student(student_id: str, current_user: dict = Depends(get_curre
     # Step 4: Delete the student
     student_result = await db.students.delete_one({"id": student_id})
     
+    await bump_data_version(student.get("user_id"))
+    
     return {
         "message": f"Schüler {student_name} erfolgreich gelöscht",
         "deleted_assignments": assignments_result.deleted_count,
@@ -1218,6 +2404,7 @@ async def batch_delete_students(
     - "sus_vorn": string (filter by first name)
     - "sus_nachn": string (filter by last name)
     - "sus_kl": string (filter by class)
+    - "exact": true (names/class must match completely instead of by prefix)
     
     Cascading deletes:
     - Dissolves active assignments
@@ -1234,12 +2421,10 @@ async def batch_delete_students(
         
         # If not "all", apply specific filters
         if not filter_params.get("all", False):
-            if filter_params.get("sus_vorn"):
-                student_filter["sus_vorn"] = {"$regex": filter_params["sus_vorn"], "$options": "i"}
-            if filter_params.get("sus_nachn"):
-                student_filter["sus_nachn"] = {"$regex": filter_params["sus_nachn"], "$options": "i"}
-            if filter_params.get("sus_kl"):
-                student_filter["sus_kl"] = {"$regex": filter_params["sus_kl"], "$options": "i"}
+            student_filter.update(compile_search_filter(
+                {field: filter_params.get(field) for field in ("sus_vorn", "sus_nachn", "sus_kl")},
+                exact=bool(filter_params.get("exact", False))
+            ))
         
         # Get all matching students
         students = await db.students.find(student_filter).to_list(length=None)
@@ -1274,7 +2459,7 @@ async def batch_delete_students(
                     if active_assignment.get("contract_id"):
                         await db.contracts.update_one(
                             {"id": active_assignment["contract_id"]},
-                            {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
+                            {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc)}}
                         )
                     
                     # Mark assignment as inactive
@@ -1282,8 +2467,8 @@ async def batch_delete_students(
                         {"id": active_assignment["id"]},
                         {"$set": {
                             "is_active": False,
-                            "unassigned_at": datetime.now(timezone.utc).isoformat(),
-                            "updated_at": datetime.now(timezone.utc).isoformat()
+                            "unassigned_at": datetime.now(timezone.utc),
+                            "updated_at": datetime.now(timezone.utc)
                         }}
                     )
                     
@@ -1292,7 +2477,7 @@ async def batch_delete_students(
                         {"id": active_assignment["ipad_id"]},
                         {"$set": {
                             "current_assignment_id": None,
-                            "updated_at": datetime.now(timezone.utc).isoformat()
+                            "updated_at": datetime.now(timezone.utc)
                         }}
                     )
                     
@@ -1305,7 +2490,7 @@ async def batch_delete_students(
                 await db.assignments.delete_many({"student_id": student_id})
                 
                 # Step 3: Delete all contracts for this student
-                await db.contracts.delete_many({"student_id": student_id})
+                await delete_contracts({"student_id": student_id})
                 
                 # Step 4: Delete the student
                 await db.students.delete_one({"id": student_id})
@@ -1315,6 +2500,9 @@ async def batch_delete_students(
             except Exception as e:
                 details.append(f"Error deleting student {student.get('sus_vorn', 'Unknown')}: {str(e)}")
         
+        if deleted_count:
+            await bump_data_version(user_filter.get("user_id"))
+        
         return {
             "message": f"Successfully deleted {deleted_count} student(s) and freed {freed_ipads} iPad(s)",
             "deleted_count": deleted_count,
@@ -1375,17 +2563,20 @@ async def auto_assign_ipads(current_user: dict = Depends(get_current_user)):
         # Update student and iPad
         await db.students.update_one(
             {"id": student["id"]},
-            {"$set": {"current_assignment_id": assignment.id, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"current_assignment_id": assignment.id, "updated_at": datetime.now(timezone.utc)}}
         )
         
         await db.ipads.update_one(
             {"id": ipad["id"]},
-            {"$set": {"current_assignment_id": assignment.id, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"current_assignment_id": assignment.id, "updated_at": datetime.now(timezone.utc)}}
         )
         
         assigned_count += 1
         details.append(f"Assigned iPad {ipad['itnr']} to {student['sus_vorn']} {student['sus_nachn']}")
     
+    if assigned_count:
+        await bump_data_version(user_filter.get("user_id"))
+    
     return AssignmentResponse(
         message=f"Successfully assigned {assigned_count} iPads",
         assigned_count=assigned_count,
@@ -1442,7 +2633,7 @@ async def manual_assign(
             {"id": student["id"]},
             {"$set": {
                 "current_assignment_id": assignment.id,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         
@@ -1451,10 +2642,12 @@ async def manual_assign(
             {"id": ipad["id"]},
             {"$set": {
                 "current_assignment_id": assignment.id,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         
+        await bump_data_version(student.get("user_id"))
+        
         return {
             "message": f"iPad {ipad['itnr']} erfolgreich {student['sus_vorn']} {student['sus_nachn']} zugewiesen",
             "assignment_id": assignment.id,
@@ -1483,59 +2676,346 @@ async def get_available_ipads(current_user: dict = Depends(get_current_user)):
         "status": i.get("status", "ok")
     } for i in ipads]
 
-@api_router.get("/assignments", response_model=List[Assignment])
-async def get_assignments(current_user: dict = Depends(get_current_user)):
-    # Apply user filter
-    user_filter = await get_user_filter(current_user)
+def contract_needs_warning(form_fields: Optional[Dict[str, Any]]) -> bool:
+    """
+    Checkbox validation of a contract's form fields. Warning appears when:
+    1. Both usage checkboxes are the same (both on or both off) OR
+    2. Both output checkboxes are the same (both on or both off)
+    No form fields = no validation issues (triangle disappears)
+    """
+    if not form_fields:
+        return False
+    nutzung_einhaltung = form_fields.get('NutzungEinhaltung') == '/Yes'
+    # Note: The actual field name in contracts is 'NutzungKenntnisname', not 'NutzungKenntnisnahme'
+    # Also, this field contains text values, not checkbox values, so we check if it's empty or not
+    nutzung_kenntnisnahme_field = form_fields.get('NutzungKenntnisnahme') or form_fields.get('NutzungKenntnisname', '')
+    nutzung_kenntnisnahme = bool(nutzung_kenntnisnahme_field and nutzung_kenntnisnahme_field != '')
+    ausgabe_neu = form_fields.get('ausgabeNeu') == '/Yes'
+    ausgabe_gebraucht = form_fields.get('ausgabeGebraucht') == '/Yes'
+    return (nutzung_einhaltung == nutzung_kenntnisnahme) or (ausgabe_neu == ausgabe_gebraucht)
+
+def contract_attachment_update(contract_id: str, form_fields: Optional[Dict[str, Any]]) -> dict:
+    """$set for an assignment that gets a (new) contract: reference plus materialized validation status"""
+    return {
+        "contract_id": contract_id,
+        "contract_warning": contract_needs_warning(form_fields),
+        "contract_warning_for": contract_id,  # Evaluated, see backfill_contract_warnings
+        "warning_dismissed": False  # New contract, warning has to be dismissed again
+    }
+
+@api_router.get("/assignments", response_model=List[Assignment])
+async def get_assignments(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGINATION_MAX_LIMIT),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    # Apply user filter
+    user_filter = await get_user_filter(current_user)
     assignment_filter = {**user_filter, "is_active": True}
-    assignments = await db.assignments.find(assignment_filter).to_list(length=None)
+    # contract_warning is stored on the assignment whenever a contract is attached
+    assignments = await find_page(
+        db.assignments, assignment_filter, PAGINATION_SORT_KEYS["assignments"], limit, after, response,
+        projection=model_list_projection(Assignment)
+    )
     
-    # Add contract validation warnings
     for assignment in assignments:
-        assignment["contract_warning"] = False
-        assignment["warning_dismissed"] = False
-        
-        if assignment.get("contract_id"):
-            contract = await db.contracts.find_one({"id": assignment["contract_id"]})
-            if contract and contract.get("form_fields"):
-                fields = contract["form_fields"]
-                
-                # Check validation: Warning appears when (NutzungEinhaltung == NutzungKenntnisnahme) OR (ausgabeNeu == ausgabeGebraucht)
-                nutzung_einhaltung = fields.get('NutzungEinhaltung') == '/Yes'
-                # Note: The actual field name in contracts is 'NutzungKenntnisname', not 'NutzungKenntnisnahme'
-                # Also, this field contains text values, not checkbox values, so we check if it's empty or not
-                nutzung_kenntnisnahme_field = fields.get('NutzungKenntnisnahme') or fields.get('NutzungKenntnisname', '')
-                nutzung_kenntnisnahme = bool(nutzung_kenntnisnahme_field and nutzung_kenntnisnahme_field != '')
-                ausgabe_neu = fields.get('ausgabeNeu') == '/Yes'
-                ausgabe_gebraucht = fields.get('ausgabeGebraucht') == '/Yes'
-                
-                # New validation logic - warning appears when:
-                # 1. Both usage checkboxes are the same (both on or both off) OR
-                # 2. Both output checkboxes are the same (both on or both off)
-                warning_needed = (nutzung_einhaltung == nutzung_kenntnisnahme) or (ausgabe_neu == ausgabe_gebraucht)
-                
-                if warning_needed:
-                    assignment["contract_warning"] = True
-                    # Get warning_dismissed status from database
-                    assignment["warning_dismissed"] = assignment.get("warning_dismissed", False)
-                else:
-                    assignment["contract_warning"] = False
-                    assignment["warning_dismissed"] = False
+        if not assignment.get("contract_warning"):
+            assignment["contract_warning"] = False
+            assignment["warning_dismissed"] = False
     
-    return [Assignment(**parse_from_mongo(assignment)) for assignment in assignments]
+    return model_list_response(Assignment, assignments, response)
 
 @api_router.post("/assignments/{assignment_id}/dismiss-warning")
 async def dismiss_contract_warning(assignment_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.assignments.update_one(
-        {"id": assignment_id},
-        {"$set": {"warning_dismissed": True}}
+    user_filter = await get_user_filter(current_user)
+    assignment = await db.assignments.find_one_and_update(
+        {"id": assignment_id, **user_filter},
+        {"$set": {"warning_dismissed": True}},
+        projection={"_id": 0, "user_id": 1}
     )
     
-    if result.matched_count == 0:
+    if assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
+    # The owner's exports change, also when an admin dismisses the warning
+    await bump_data_version(assignment.get("user_id"))
+    
     return {"message": "Warning dismissed"}
 
+async def backfill_contract_warnings(missing_only: bool = False) -> Dict[str, int]:
+    """
+    Store contract_warning on assignments with a contract (batched, idempotent).
+    Assignments from before the warning was stored carry the model default False,
+    contract_warning_for marks the ones evaluated for their current contract.
+    missing_only: only assignments without that marker, cheap enough for every startup.
+    warning_dismissed is kept.
+    """
+    match = {"contract_id": {"$ne": None}}
+    if missing_only:
+        match["contract_warning_for"] = {"$exists": False}
+    cursor = db.assignments.aggregate([
+        {"$match": match},
+        {"$lookup": {
+            "from": "contracts",
+            "let": {"contract_id": "$contract_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$contract_id"]}}},
+                {"$project": {"_id": 0, "form_fields": 1}}
+            ],
+            "as": "contract"
+        }},
+        {"$project": {"_id": 0, "id": 1, "contract_id": 1, "contract_warning": 1, "contract_warning_for": 1,
+                      "contract.form_fields": 1}}
+    ], batchSize=500)
+    
+    checked_count = 0
+    updated_count = 0
+    operations = []
+    async for assignment in cursor:
+        checked_count += 1
+        contract = assignment["contract"][0] if assignment["contract"] else {}
+        contract_warning = contract_needs_warning(contract.get("form_fields"))
+        if (assignment.get("contract_warning") != contract_warning
+                or assignment.get("contract_warning_for") != assignment["contract_id"]):
+            # Conditional on the contract, an attachment in the meantime stored its own status
+            operations.append(UpdateOne(
+                {"id": assignment["id"], "contract_id": assignment["contract_id"]},
+                {"$set": {"contract_warning": contract_warning, "contract_warning_for": assignment["contract_id"]}}
+            ))
+        if len(operations) >= 500:
+            result = await db.assignments.bulk_write(operations, ordered=False)
+            updated_count += result.modified_count
+            operations = []
+    if operations:
+        result = await db.assignments.bulk_write(operations, ordered=False)
+        updated_count += result.modified_count
+    
+    if updated_count:
+        await bump_data_version(None)
+    return {"checked_count": checked_count, "updated_count": updated_count}
+
+@api_router.post("/assignments/migrate-contract-warnings")
+async def migrate_contract_warnings(current_user: dict = Depends(get_current_user)):
+    """
+    Re-evaluate the stored contract_warning of every assignment with a contract.
+    Assignments that were never evaluated are backfilled at startup already.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can run migrations")
+    
+    try:
+        counts = await backfill_contract_warnings()
+        return {"message": "Contract warning migration completed", **counts}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
+
+# Contract metadata queries
+# Every read of contract documents goes through these helpers so the (legacy,
+# up to 5 MB) file_data blob never leaves Mongo. Only download_contract and the
+# file migration read the blob. tests/test_contract_queries.py enforces this.
+CONTRACT_METADATA_PROJECTION = {"_id": 0, "file_data": 0}
+
+def contract_projection(fields: Optional[List[str]] = None) -> dict:
+    """Projection for contract reads: the given fields only, or everything except file_data"""
+    if not fields:
+        return CONTRACT_METADATA_PROJECTION
+    if "file_data" in fields:
+        raise ValueError("file_data is only readable through the download endpoint")
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+async def find_contract_metadata(query: dict, fields: Optional[List[str]] = None) -> List[dict]:
+    return await db.contracts.find(query, contract_projection(fields)).to_list(length=None)
+
+async def get_contract_metadata(contract_id: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+    return await db.contracts.find_one({"id": contract_id}, contract_projection(fields))
+
+def contract_summary(contract: dict, default_active: bool = True) -> dict:
+    """Contract metadata as returned by listing/detail endpoints"""
+    return {
+        "id": contract.get("id"),
+        "assignment_id": contract.get("assignment_id"),
+        "itnr": contract.get("itnr"),
+        "student_name": contract.get("student_name"),
+        "filename": contract.get("filename"),
+        "form_fields": contract.get("form_fields", {}),
+        "uploaded_at": contract.get("uploaded_at"),
+        "is_active": contract.get("is_active", default_active)
+    }
+
+# Contract file storage (GridFS)
+CONTRACT_MIGRATION_BATCH_SIZE = int(os.environ.get("CONTRACT_MIGRATION_BATCH_SIZE", "20"))
+
+def extract_form_fields(contents: bytes) -> Dict[str, Any]:
+    """Read the AcroForm fields of a contract PDF ({} if there are none)"""
+    reader = PyPDF2.PdfReader(io.BytesIO(contents))
+    form_fields = {}
+    
+    try:
+        if '/AcroForm' in reader.trailer['/Root']:
+            form = reader.trailer['/Root']['/AcroForm']
+            if '/Fields' in form:
+                for field in form['/Fields']:
+                    field_obj = field.get_object()
+                    field_name = field_obj.get('/T')
+                    field_value = field_obj.get('/V')
+                    
+                    if field_name:
+                        form_fields[str(field_name)] = plain_pdf_value(field_value)
+    except:
+        form_fields = {}
+    return form_fields
+
+def plain_pdf_value(value):
+    """PyPDF2 objects -> plain Python values (picklable for the process pool, storable in Mongo)"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [plain_pdf_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): plain_pdf_value(item) for key, item in value.items()}
+    return str(value)
+
+def extract_form_fields_timed(contents: bytes) -> Tuple[Dict[str, Any], float]:
+    """Process pool entry point: form fields and the parse time in seconds"""
+    started = time.perf_counter()
+    form_fields = extract_form_fields(contents)
+    return form_fields, time.perf_counter() - started
+
+# PyPDF2 is pure Python and CPU bound: parse in worker processes so the event loop
+# stays responsive and a multi-upload uses all cores. Created on first use.
+PDF_PARSE_WORKERS = max(1, int(os.environ.get("PDF_PARSE_WORKERS", str(os.cpu_count() or 2))))
+_pdf_parse_executor: Optional[ProcessPoolExecutor] = None
+
+def get_pdf_parse_executor() -> ProcessPoolExecutor:
+    global _pdf_parse_executor
+    if _pdf_parse_executor is None:
+        _pdf_parse_executor = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS)
+    return _pdf_parse_executor
+
+async def parse_form_fields(contents: bytes) -> Tuple[Dict[str, Any], float]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pdf_parse_executor(), extract_form_fields_timed, contents)
+
+# A blob is "pending" while its first upload writes the GridFS file; only
+# finished blobs are shared, a pending one nobody finished is taken over.
+CONTRACT_BLOB_WAIT_SECONDS = 0.2
+CONTRACT_BLOB_WAIT_ATTEMPTS = 50
+CONTRACT_BLOB_PENDING_TIMEOUT = timedelta(minutes=5)
+
+async def store_contract_file(filename: str, contents: bytes, user_id: str,
+                              form_fields: Optional[Dict[str, Any]] = None,
+                              sha256: Optional[str] = None) -> Tuple[dict, Dict[str, Any]]:
+    """
+    Store a contract PDF content-addressed by its SHA-256 (the hash is the GridFS file id).
+    Identical uploads only bump the reference count in db.contract_blobs and reuse the
+    form fields extracted the first time. Returns (file reference, form fields).
+    """
+    sha256 = sha256 or hashlib.sha256(contents).hexdigest()
+    file_ref = {"file_id": sha256, "file_size": len(contents)}
+    
+    for _ in range(CONTRACT_BLOB_WAIT_ATTEMPTS):
+        # Blobs from before the state marker have no state and are complete
+        blob = await db.contract_blobs.find_one_and_update(
+            {"_id": sha256, "state": {"$ne": "pending"}},
+            {"$inc": {"ref_count": 1, "dedup_hits": 1}},
+            projection={"form_fields": 1}
+        )
+        if blob:
+            return file_ref, blob.get("form_fields") or {}
+        
+        if form_fields is None:
+            form_fields, _ = await parse_form_fields(contents)
+        now = datetime.now(timezone.utc)
+        try:
+            await db.contract_blobs.insert_one({
+                "_id": sha256,
+                "state": "pending",
+                "ref_count": 1,
+                "dedup_hits": 0,
+                "size": len(contents),
+                "form_fields": form_fields,
+                "created_at": now
+            })
+            break
+        except DuplicateKeyError:
+            # Another upload is writing this file: wait for it, unless it was abandoned
+            claimed = await db.contract_blobs.find_one_and_update(
+                {"_id": sha256, "state": "pending", "created_at": {"$lt": now - CONTRACT_BLOB_PENDING_TIMEOUT}},
+                {"$set": {"ref_count": 1, "form_fields": form_fields, "created_at": now}}
+            )
+            if claimed:
+                try:
+                    await contract_files.delete(sha256)  # chunks of the abandoned upload
+                except NoFile:
+                    pass
+                break
+            await asyncio.sleep(CONTRACT_BLOB_WAIT_SECONDS)
+    else:
+        raise HTTPException(status_code=503, detail="The same PDF is being stored by another upload, please retry")
+    
+    try:
+        await contract_files.upload_from_stream_with_id(
+            sha256, filename, contents,
+            metadata={"user_id": user_id, "content_type": "application/pdf"}
+        )
+    except Exception:
+        # Nobody else can reference a pending blob, dropping our reference removes it
+        await release_contract_file(sha256)
+        raise
+    await db.contract_blobs.update_one({"_id": sha256}, {"$set": {"state": "ready"}})
+    return file_ref, form_fields
+
+async def release_contract_file(file_id: Optional[str], count: int = 1):
+    """Drop `count` references to a stored contract PDF, the file is removed with the last one"""
+    if not file_id:
+        return
+    blob = await db.contract_blobs.find_one_and_update(
+        {"_id": file_id},
+        {"$inc": {"ref_count": -count}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is not None:
+        if blob["ref_count"] > 0:
+            return
+        deleted = await db.contract_blobs.delete_one({"_id": file_id, "ref_count": {"$lte": 0}})
+        if not deleted.deleted_count:
+            return  # Re-uploaded in the meantime
+    # Files stored before deduplication have no blob entry and a single owner
+    try:
+        await contract_files.delete(file_id)
+    except NoFile:
+        pass
+
+async def delete_contracts(query: dict):
+    """Delete contract documents and release their stored PDFs"""
+    contract_ids = await db.contracts.distinct("id", query)
+    file_counts = await db.contracts.aggregate([
+        {"$match": {"$and": [query, {"file_id": {"$ne": None}}]}},
+        {"$group": {"_id": "$file_id", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    result = await db.contracts.delete_many(query)
+    for entry in file_counts:
+        await release_contract_file(entry["_id"], entry["count"])
+    if contract_ids:
+        # Without its contract an assignment has nothing left to warn about
+        await db.assignments.update_many(
+            {"contract_id": {"$in": contract_ids}, "contract_warning": True},
+            {"$set": {"contract_warning": False}}
+        )
+    return result
+
+async def iter_contract_file(grid_out) -> AsyncIterator[bytes]:
+    """Stream a GridFS file chunk by chunk"""
+    while True:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        yield chunk
+
 @api_router.post("/assignments/{assignment_id}/upload-contract")
 async def upload_contract_for_assignment(
     assignment_id: str, 
@@ -1554,35 +3034,15 @@ async def upload_contract_for_assignment(
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
+    file_ref = None
+    inserted_contract_id = None
     try:
         contents = await file.read()
         # Security: Validate uploaded file
         validate_uploaded_file(contents, file.filename, max_size_mb=5, allowed_types=['.pdf'])
         
-        # Extract form fields from PDF
-        reader = PyPDF2.PdfReader(io.BytesIO(contents))
-        form_fields = {}
-        
-        try:
-            if '/AcroForm' in reader.trailer['/Root']:
-                form = reader.trailer['/Root']['/AcroForm']
-                if '/Fields' in form:
-                    for field in form['/Fields']:
-                        field_obj = field.get_object()
-                        field_name = field_obj.get('/T')
-                        field_value = field_obj.get('/V')
-                        
-                        if field_name:
-                            form_fields[field_name] = field_value
-        except:
-            form_fields = {}
-        
-        # If assignment has an existing contract, mark it as inactive
-        if assignment.get("contract_id"):
-            await db.contracts.update_one(
-                {"id": assignment["contract_id"]},
-                {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
-            )
+        # Store the PDF (deduplicated) and extract form fields unless already known
+        file_ref, form_fields = await store_contract_file(file.filename, contents, current_user["id"])
         
         # Create new contract
         new_contract = Contract(
@@ -1591,45 +3051,27 @@ async def upload_contract_for_assignment(
             itnr=assignment["itnr"],
             student_name=assignment["student_name"],
             filename=file.filename,
-            file_data=contents,
+            **file_ref,
             form_fields=form_fields
         )
         
-        contract_dict = prepare_for_mongo(new_contract.dict())
+        contract_dict = prepare_for_mongo(new_contract.dict(exclude={"file_data"}))
         await db.contracts.insert_one(contract_dict)
+        inserted_contract_id = new_contract.id
         
-        # Update assignment with new contract reference
-        await db.assignments.update_one(
-            {"id": assignment_id},
-            {"$set": {"contract_id": new_contract.id}}
-        )
+        # Update assignment with new contract reference and its validation status
+        attachment = contract_attachment_update(new_contract.id, form_fields)
+        contract_warning = attachment["contract_warning"]
+        await db.assignments.update_one({"id": assignment_id}, {"$set": attachment})
+        file_ref = None  # Reference is owned by the attached contract now
         
-        # Apply validation logic to determine if warning should be shown
-        contract_warning = False
-        warning_dismissed = False
-        
-        if form_fields:
-            # Apply the same validation logic as in get_assignments
-            nutzung_einhaltung = form_fields.get('NutzungEinhaltung') == '/Yes'
-            nutzung_kenntnisnahme_field = form_fields.get('NutzungKenntnisnahme') or form_fields.get('NutzungKenntnisname', '')
-            nutzung_kenntnisnahme = bool(nutzung_kenntnisnahme_field and nutzung_kenntnisnahme_field != '')
-            ausgabe_neu = form_fields.get('ausgabeNeu') == '/Yes'
-            ausgabe_gebraucht = form_fields.get('ausgabeGebraucht') == '/Yes'
-            
-            # New validation logic: warning appears when checkboxes are same
-            warning_needed = (nutzung_einhaltung == nutzung_kenntnisnahme) or (ausgabe_neu == ausgabe_gebraucht)
-            
-            if warning_needed:
-                contract_warning = True
-        else:
-            # No form fields = no validation issues (triangle disappears)
-            contract_warning = False
-        
-        # Reset warning dismissed status for new contract
-        await db.assignments.update_one(
-            {"id": assignment_id},
-            {"$set": {"warning_dismissed": False}}
-        )
+        # The previous contract is replaced, mark it as inactive
+        if assignment.get("contract_id"):
+            await db.contracts.update_one(
+                {"id": assignment["contract_id"]},
+                {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc)}}
+            )
+        await bump_data_version(assignment.get("user_id"))
         
         validation_status = "validation_warning" if contract_warning else "no_validation_issues"
         message = f"Contract uploaded successfully for assignment {assignment['itnr']} → {assignment['student_name']}"
@@ -1650,6 +3092,11 @@ async def upload_contract_for_assignment(
         }
         
     except Exception as e:
+        # Undo the parts that were stored so the blob's ref_count stays exact
+        if file_ref:
+            if inserted_contract_id:
+                await db.contracts.delete_one({"id": inserted_contract_id})
+            await release_contract_file(file_ref["file_id"])
         raise HTTPException(status_code=500, detail=f"Error processing contract: {str(e)}")
 
 # Contract endpoints
@@ -1659,161 +3106,215 @@ async def upload_multiple_contracts(files: List[UploadFile] = File(...), current
     processed_count = 0
     unassigned_count = 0
     
-    for file in files[:50]:  # Limit to 50 files max
-        if not file.filename.endswith('.pdf'):
-            results.append({"filename": file.filename, "status": "error", "message": "Only .pdf files are allowed"})
-            continue
-            
-        try:
-            contents = await file.read()
-            # Security: Validate uploaded file
-            validate_uploaded_file(contents, file.filename, max_size_mb=5, allowed_types=['.pdf'])
-            
-            # Extract form fields from PDF
-            reader = PyPDF2.PdfReader(io.BytesIO(contents))
-            form_fields = {}
-            
+    # Pipeline: file N+1 is read while file N is parsed in the process pool and
+    # file N-1 is written. The bounded queue limits how far reading runs ahead.
+    queue = asyncio.Queue(maxsize=PDF_PARSE_WORKERS)
+    
+    async def read_files():
+        for file in files[:50]:  # Limit to 50 files max
+            item = {"file": file, "error": None, "parse": None, "timing": {}}
+            if not file.filename.endswith('.pdf'):
+                item["error"] = "Only .pdf files are allowed"
+            else:
+                started = time.perf_counter()
+                try:
+                    contents = await file.read()
+                    # Security: Validate uploaded file
+                    validate_uploaded_file(contents, file.filename, max_size_mb=5, allowed_types=['.pdf'])
+                    item["contents"] = contents
+                    item["sha256"] = hashlib.sha256(contents).hexdigest()
+                    # Already stored PDFs reuse their cached form fields, no parsing needed
+                    if not await db.contract_blobs.find_one({"_id": item["sha256"]}, {"_id": 1}):
+                        item["parse"] = asyncio.ensure_future(parse_form_fields(contents))
+                except Exception as e:
+                    item["error"] = f"Error: {str(e)}"
+                item["timing"]["read_ms"] = round((time.perf_counter() - started) * 1000, 1)
             try:
-                if '/AcroForm' in reader.trailer['/Root']:
-                    form = reader.trailer['/Root']['/AcroForm']
-                    if '/Fields' in form:
-                        for field in form['/Fields']:
-                            field_obj = field.get_object()
-                            field_name = field_obj.get('/T')
-                            field_value = field_obj.get('/V')
-                            
-                            if field_name:
-                                form_fields[field_name] = field_value
-            except:
-                form_fields = {}
-            
-            # Check if contract has required fields for auto-assignment (PDF form fields)
-            itnr = form_fields.get('ITNr')
-            sus_vorn = form_fields.get('SuSVorn')
-            sus_nachn = form_fields.get('SuSNachn')
-            
-            assignment_found = False
-            assignment_method = ""
+                await queue.put(item)
+            except asyncio.CancelledError:
+                if item["parse"] is not None:
+                    item["parse"].cancel()
+                raise
+        await queue.put(None)
+    
+    def file_result(item, status, message):
+        timing = item["timing"]
+        if "write_started" in item:
+            timing["write_ms"] = round((time.perf_counter() - item.pop("write_started")) * 1000, 1)
+        return {"filename": item["file"].filename, "status": status, "message": message, "timing_ms": timing}
+    
+    reader_task = asyncio.create_task(read_files())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            file = item["file"]
+            if item["error"]:
+                results.append(file_result(item, "error", item["error"]))
+                continue
             
-            if itnr and sus_vorn and sus_nachn:
-                # Try auto-assignment by PDF form fields (user's assignments only)
-                user_filter = await get_user_filter(current_user)
-                assignment = await db.assignments.find_one({
-                    **user_filter,
-                    "itnr": str(itnr),
-                    "is_active": True
-                })
+            file_ref = None
+            try:
+                contents = item["contents"]
+                form_fields = None
+                if item["parse"] is not None:
+                    form_fields, parse_seconds = await item["parse"]
+                    item["timing"]["parse_ms"] = round(parse_seconds * 1000, 1)
+                item["write_started"] = time.perf_counter()
                 
-                if assignment:
-                    assignment_found = True
-                    assignment_method = f"PDF form fields (iPad {itnr})"
-                    
-                    # Create contract with assignment
-                    contract = Contract(
-                        user_id=current_user["id"],
-                        assignment_id=assignment["id"],
-                        itnr=str(itnr),
-                        student_name=f"{sus_vorn} {sus_nachn}",
-                        filename=file.filename,
-                        file_data=contents,
-                        form_fields=form_fields
-                    )
-                    
-                    contract_dict = prepare_for_mongo(contract.dict())
-                    await db.contracts.insert_one(contract_dict)
-                    
-                    # Update assignment with contract reference
-                    await db.assignments.update_one(
-                        {"id": assignment["id"]},
-                        {"$set": {"contract_id": contract.id}}
-                    )
+                # Store the PDF once (deduplicated), every contract variant below only references it.
+                # Form fields of an already known PDF come from the blob cache instead of PyPDF2.
+                file_ref, form_fields = await store_contract_file(
+                    file.filename, contents, current_user["id"], form_fields=form_fields, sha256=item["sha256"]
+                )
+                
+                # Check if contract has required fields for auto-assignment (PDF form fields)
+                itnr = form_fields.get('ITNr')
+                sus_vorn = form_fields.get('SuSVorn')
+                sus_nachn = form_fields.get('SuSNachn')
+                
+                assignment_found = False
+                assignment_method = ""
+                
+                if itnr and sus_vorn and sus_nachn:
+                    # Try auto-assignment by PDF form fields (user's assignments only)
+                    user_filter = await get_user_filter(current_user)
+                    assignment = await db.assignments.find_one({
+                        **user_filter,
+                        "itnr": str(itnr),
+                        "is_active": True
+                    })
                     
-                    processed_count += 1
-                    results.append({"filename": file.filename, "status": "assigned", "message": f"Assigned by {assignment_method}"})
-                    continue
-            
-            # If PDF form fields didn't work, try filename-based auto-assignment (Vorname_Nachname.pdf)
-            if not assignment_found:
-                filename_without_ext = file.filename.replace('.pdf', '').replace('.PDF', '')
-                if '_' in filename_without_ext:
-                    parts = filename_without_ext.split('_')
-                    if len(parts) == 2:
-                        vorname_file, nachname_file = parts[0].strip(), parts[1].strip()
+                    if assignment:
+                        assignment_found = True
+                        assignment_method = f"PDF form fields (iPad {itnr})"
                         
-                        # Search for student with matching name in active assignments (user's assignments only)
-                        user_filter = await get_user_filter(current_user)
-                        match_filter = {
-                            **user_filter,
-                            "is_active": True,
-                            "student.sus_vorn": {"$regex": f"^{vorname_file}$", "$options": "i"},
-                            "student.sus_nachn": {"$regex": f"^{nachname_file}$", "$options": "i"}
-                        }
+                        # Create contract with assignment
+                        contract = Contract(
+                            user_id=current_user["id"],
+                            assignment_id=assignment["id"],
+                            itnr=str(itnr),
+                            student_name=f"{sus_vorn} {sus_nachn}",
+                            filename=file.filename,
+                            **file_ref,
+                            form_fields=form_fields
+                        )
                         
-                        pipeline = [
-                            {
-                                "$lookup": {
-                                    "from": "students",
-                                    "localField": "student_id",
-                                    "foreignField": "id",
-                                    "as": "student"
-                                }
-                            },
-                            {
-                                "$match": match_filter
-                            }
-                        ]
+                        contract_dict = prepare_for_mongo(contract.dict(exclude={"file_data"}))
+                        await db.contracts.insert_one(contract_dict)
+                        file_ref = None  # Reference is owned by the contract now
                         
-                        assignment_results = await db.assignments.aggregate(pipeline).to_list(length=None)
+                        # Update assignment with contract reference and validation status
+                        await db.assignments.update_one(
+                            {"id": assignment["id"]},
+                            {"$set": contract_attachment_update(contract.id, form_fields)}
+                        )
                         
-                        if assignment_results:
-                            assignment = assignment_results[0]
-                            student_data = assignment["student"][0] if assignment["student"] else None
+                        processed_count += 1
+                        results.append(file_result(item, "assigned", f"Assigned by {assignment_method}"))
+                        continue
+                
+                # If PDF form fields didn't work, try filename-based auto-assignment (Vorname_Nachname.pdf)
+                if not assignment_found:
+                    filename_without_ext = file.filename.replace('.pdf', '').replace('.PDF', '')
+                    if '_' in filename_without_ext:
+                        parts = filename_without_ext.split('_')
+                        if len(parts) == 2:
+                            vorname_file, nachname_file = parts[0].strip(), parts[1].strip()
                             
-                            if student_data:
-                                assignment_found = True
-                                assignment_method = f"filename pattern ({vorname_file}_{nachname_file})"
-                                
-                                # Create contract with assignment
-                                contract = Contract(
-                                    user_id=current_user["id"],
-                                    assignment_id=assignment["id"],
-                                    itnr=assignment["itnr"],
-                                    student_name=f"{student_data['sus_vorn']} {student_data['sus_nachn']}",
-                                    filename=file.filename,
-                                    file_data=contents,
-                                    form_fields=form_fields
-                                )
-                                
-                                contract_dict = prepare_for_mongo(contract.dict())
-                                await db.contracts.insert_one(contract_dict)
-                                
-                                # Update assignment with contract reference
-                                await db.assignments.update_one(
-                                    {"id": assignment["id"]},
-                                    {"$set": {"contract_id": contract.id}}
-                                )
+                            # Search for student with matching name in active assignments (user's assignments only)
+                            user_filter = await get_user_filter(current_user)
+                            match_filter = {
+                                **user_filter,
+                                "is_active": True,
+                                "student.sus_vorn": {"$regex": f"^{re.escape(vorname_file)}$", "$options": "i"},
+                                "student.sus_nachn": {"$regex": f"^{re.escape(nachname_file)}$", "$options": "i"}
+                            }
+                            
+                            pipeline = [
+                                {
+                                    "$lookup": {
+                                        "from": "students",
+                                        "localField": "student_id",
+                                        "foreignField": "id",
+                                        "as": "student"
+                                    }
+                                },
+                                {
+                                    "$match": match_filter
+                                }
+                            ]
+                            
+                            assignment_results = await db.assignments.aggregate(pipeline).to_list(length=None)
+                            
+                            if assignment_results:
+                                assignment = assignment_results[0]
+                                student_data = assignment["student"][0] if assignment["student"] else None
                                 
-                                processed_count += 1
-                                results.append({"filename": file.filename, "status": "assigned", "message": f"Assigned by {assignment_method}"})
-                                continue
-            
-            # Create unassigned contract
-            contract = Contract(
-                user_id=current_user["id"],
-                filename=file.filename,
-                file_data=contents,
-                form_fields=form_fields,
-                is_active=False  # Unassigned contracts are inactive
-            )
-            
-            contract_dict = prepare_for_mongo(contract.dict())
-            await db.contracts.insert_one(contract_dict)
-            
-            unassigned_count += 1
-            results.append({"filename": file.filename, "status": "unassigned", "message": "Contract saved as unassigned"})
-            
-        except Exception as e:
-            results.append({"filename": file.filename, "status": "error", "message": f"Error: {str(e)}"})
+                                if student_data:
+                                    assignment_found = True
+                                    assignment_method = f"filename pattern ({vorname_file}_{nachname_file})"
+                                    
+                                    # Create contract with assignment
+                                    contract = Contract(
+                                        user_id=current_user["id"],
+                                        assignment_id=assignment["id"],
+                                        itnr=assignment["itnr"],
+                                        student_name=f"{student_data['sus_vorn']} {student_data['sus_nachn']}",
+                                        filename=file.filename,
+                                        **file_ref,
+                                        form_fields=form_fields
+                                    )
+                                    
+                                    contract_dict = prepare_for_mongo(contract.dict(exclude={"file_data"}))
+                                    await db.contracts.insert_one(contract_dict)
+                                    file_ref = None  # Reference is owned by the contract now
+                                    
+                                    # Update assignment with contract reference and validation status
+                                    await db.assignments.update_one(
+                                        {"id": assignment["id"]},
+                                        {"$set": contract_attachment_update(contract.id, form_fields)}
+                                    )
+                                    
+                                    processed_count += 1
+                                    results.append(file_result(item, "assigned", f"Assigned by {assignment_method}"))
+                                    continue
+                
+                # Create unassigned contract
+                contract = Contract(
+                    user_id=current_user["id"],
+                    filename=file.filename,
+                    **file_ref,
+                    form_fields=form_fields,
+                    is_active=False  # Unassigned contracts are inactive
+                )
+                
+                contract_dict = prepare_for_mongo(contract.dict(exclude={"file_data"}))
+                await db.contracts.insert_one(contract_dict)
+                file_ref = None  # Reference is owned by the contract now
+                
+                unassigned_count += 1
+                results.append(file_result(item, "unassigned", "Contract saved as unassigned"))
+                
+            except Exception as e:
+                if file_ref:
+                    await release_contract_file(file_ref["file_id"])
+                results.append(file_result(item, "error", f"Error: {str(e)}"))
+    finally:
+        # Client disconnect or an unexpected error: stop reading, drop queued parses
+        reader_task.cancel()
+        while not queue.empty():
+            pending = queue.get_nowait()
+            if pending and pending["parse"] is not None:
+                pending["parse"].cancel()
+        try:
+            await reader_task
+        except asyncio.CancelledError:
+            pass
+    
+    if processed_count:
+        await bump_data_version(current_user["id"])
     
     return {
         "message": f"Processed {len(files)} contracts: {processed_count} assigned, {unassigned_count} unassigned",
@@ -1827,23 +3328,13 @@ async def get_unassigned_contracts(current_user: dict = Depends(get_current_user
     # Apply user filter
     user_filter = await get_user_filter(current_user)
     contract_filter = {**user_filter, "is_active": False}
-    contracts = await db.contracts.find(contract_filter).to_list(length=None)
+    contracts = await find_contract_metadata(contract_filter)
     
-    # Return contracts without file_data to avoid encoding issues
+    # Metadata only (file_data is never loaded)
     result = []
     for contract in contracts:
         try:
-            contract_dict = {
-                "id": contract.get("id"),
-                "assignment_id": contract.get("assignment_id"),
-                "itnr": contract.get("itnr"),
-                "student_name": contract.get("student_name"),
-                "filename": contract.get("filename"),
-                "form_fields": contract.get("form_fields", {}),
-                "uploaded_at": contract.get("uploaded_at"),
-                "is_active": contract.get("is_active", False)
-            }
-            result.append(contract_dict)
+            result.append(contract_summary(contract, default_active=False))
         except Exception as e:
             print(f"Error processing contract {contract.get('id')}: {e}")
             continue
@@ -1871,7 +3362,7 @@ async def assign_contract_to_assignment(contract_id: str, assignment_id: str, cu
     await validate_resource_ownership("assignment", assignment_id, current_user)
     
     # Get contract and assignment
-    contract = await db.contracts.find_one({"id": contract_id})
+    contract = await get_contract_metadata(contract_id, fields=["id", "form_fields"])
     assignment = await db.assignments.find_one({"id": assignment_id})
     
     if not contract or not assignment:
@@ -1885,16 +3376,18 @@ async def assign_contract_to_assignment(contract_id: str, assignment_id: str, cu
             "itnr": assignment["itnr"],
             "student_name": assignment["student_name"],
             "is_active": True,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
     
-    # Update assignment
+    # Update assignment with contract reference and validation status
     await db.assignments.update_one(
         {"id": assignment_id},
-        {"$set": {"contract_id": contract_id}}
+        {"$set": contract_attachment_update(contract_id, contract.get("form_fields"))}
     )
     
+    await bump_data_version(assignment.get("user_id"))
+    
     return {"message": "Contract assigned successfully"}
 
 # iPad status management
@@ -1919,10 +3412,12 @@ async def update_ipad_status(ipad_id: str, status: str, current_user: dict = Dep
         {"id": ipad_id},
         {"$set": {
             "status": status,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }}
     )
     
+    await bump_data_version(ipad.get("user_id"))
+    
     return {"message": f"iPad status updated to {status}"}
 
 
@@ -1943,6 +3438,8 @@ async def migrate_ipad_status(current_user: dict = Depends(get_current_user)):
             {"$set": {"status": "ok"}}
         )
         
+        await bump_data_version(None)
+        
         return {
             "message": "iPad status migration completed",
             "updated_count": result1.modified_count
@@ -1952,6 +3449,207 @@ async def migrate_ipad_status(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
 
 
+@api_router.post("/students/migrate-birth-dates")
+async def migrate_birth_dates(current_user: dict = Depends(get_current_user)):
+    """
+    Migration endpoint to store every sus_geb in the canonical YYYY-MM-DD form.
+    Runs in batches and can be repeated; already canonical values are skipped.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can run migrations")
+    
+    try:
+        cursor = db.students.find(
+            {"sus_geb": {"$type": "string", "$not": BIRTH_DATE_PATTERN}},
+            {"_id": 0, "id": 1, "sus_geb": 1}
+        ).batch_size(500)
+        
+        checked_count = 0
+        updated_count = 0
+        operations = []
+        async for student in cursor:
+            checked_count += 1
+            normalized = normalize_birth_date(student["sus_geb"])
+            if normalized != student["sus_geb"]:
+                operations.append(UpdateOne({"id": student["id"]}, {"$set": {"sus_geb": normalized}}))
+            if len(operations) >= 500:
+                result = await db.students.bulk_write(operations, ordered=False)
+                updated_count += result.modified_count
+                operations = []
+        if operations:
+            result = await db.students.bulk_write(operations, ordered=False)
+            updated_count += result.modified_count
+        
+        if updated_count:
+            await bump_data_version(None)
+        
+        return {
+            "message": "Birth date migration completed",
+            "checked_count": checked_count,
+            "updated_count": updated_count,
+            "unparseable_count": checked_count - updated_count
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
+
+
+# Timestamps of every collection; older versions stored them as ISO strings
+TIMESTAMP_FIELDS = {
+    "users": ["created_at", "updated_at"],
+    "ipads": ["created_at", "updated_at"],
+    "students": ["created_at", "updated_at"],
+    "assignments": ["assigned_at", "unassigned_at", "created_at", "updated_at"],
+    "contracts": ["uploaded_at", "updated_at"],
+    "contract_blobs": ["created_at"],
+    "jobs": ["created_at", "updated_at", "finished_at"],
+    "global_settings": ["created_at", "updated_at"],
+}
+TIMESTAMP_MIGRATION_BATCH_SIZE = 500
+# Set on documents with strings that are no timestamp; they keep the value
+# for inspection but are not selected (and rescanned) by later runs
+TIMESTAMP_MIGRATION_FAILED = "_ts_migration_failed"
+
+def string_timestamp_filter(fields: List[str]) -> dict:
+    return {
+        "$or": [{field: {"$type": "string"}} for field in fields],
+        TIMESTAMP_MIGRATION_FAILED: {"$exists": False}
+    }
+
+async def pending_timestamp_migration(fields_by_collection: Dict[str, List[str]]) -> bool:
+    """True if one of the fields still holds an ISO string somewhere"""
+    for name, fields in fields_by_collection.items():
+        if await db[name].find_one(string_timestamp_filter(fields), {"_id": 1}):
+            return True
+    return False
+
+@api_router.post("/timestamps/migrate")
+async def migrate_timestamps(
+    max_batches: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Convert ISO string timestamps into native BSON dates, batch by batch in
+    _id order. Resumable: only documents that still hold strings are selected,
+    so an interrupted (or max_batches limited) run continues where it stopped.
+    Unparseable values are marked with _ts_migration_failed (list of fields)
+    and skipped from then on. Each update is conditional on the original
+    string, concurrent writes win.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can run migrations")
+    
+    try:
+        collections = {}
+        batches = 0
+        for name, fields in TIMESTAMP_FIELDS.items():
+            collection = db[name]
+            query = string_timestamp_filter(fields)
+            report = collections[name] = {"checked_count": 0, "updated_count": 0, "unparseable_count": 0}
+            last_id = None
+            while max_batches is None or batches < max_batches:
+                batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+                docs = await collection.find(batch_query, {"_id": 1, **{field: 1 for field in fields}}) \
+                    .sort("_id", 1).limit(TIMESTAMP_MIGRATION_BATCH_SIZE).to_list(length=TIMESTAMP_MIGRATION_BATCH_SIZE)
+                if not docs:
+                    break
+                batches += 1
+                last_id = docs[-1]["_id"]
+                
+                operations = []
+                for doc in docs:
+                    report["checked_count"] += 1
+                    original, converted, failed = {}, {}, []
+                    for field in fields:
+                        value = doc.get(field)
+                        if not isinstance(value, str):
+                            continue
+                        original[field] = value
+                        parsed = parse_legacy_timestamp(value)
+                        if parsed is None:
+                            report["unparseable_count"] += 1
+                            failed.append(field)
+                        else:
+                            converted[field] = parsed
+                    if failed:
+                        converted[TIMESTAMP_MIGRATION_FAILED] = failed
+                    if converted:
+                        operations.append(UpdateOne({"_id": doc["_id"], **original}, {"$set": converted}))
+                if operations:
+                    result = await collection.bulk_write(operations, ordered=False)
+                    report["updated_count"] += result.modified_count
+        
+        # A limited run can end exactly on the last batch, so look for more work
+        complete = not await pending_timestamp_migration(TIMESTAMP_FIELDS)
+        if any(report["updated_count"] for report in collections.values()):
+            await bump_data_version(None)
+        
+        return {
+            "message": "Timestamp migration completed" if complete else "Timestamp migration paused, run again to continue",
+            "complete": complete,
+            "batches": batches,
+            "collections": collections
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
+
+
+SEARCH_KEY_SOURCES = (("students", ["sus_vorn", "sus_nachn", "sus_kl"]),
+                      ("ipads", ["itnr"]),
+                      ("assignments", ["itnr"]))
+
+async def backfill_search_keys(missing_only: bool = False) -> Dict[str, int]:
+    """
+    Write the normalized search keys of existing documents (batched, idempotent).
+    missing_only: only documents without keys, cheap enough for every startup.
+    """
+    updated = {}
+    for name, fields in SEARCH_KEY_SOURCES:
+        collection = db[name]
+        projection = {"_id": 0, "id": 1}
+        for field in fields:
+            projection[field] = 1
+            projection[SEARCH_KEY_FIELDS[field]] = 1
+        query = {}
+        if missing_only:
+            query = {"$or": [{field: {"$type": "string"}, SEARCH_KEY_FIELDS[field]: {"$exists": False}} for field in fields]}
+        
+        updated_count = 0
+        operations = []
+        async for doc in collection.find(query, projection).batch_size(500):
+            keys = add_search_keys({field: doc.get(field) for field in fields})
+            changes = {key: value for key, value in keys.items() if key not in fields and doc.get(key) != value}
+            if changes:
+                operations.append(UpdateOne({"id": doc["id"]}, {"$set": changes}))
+            if len(operations) >= 500:
+                result = await collection.bulk_write(operations, ordered=False)
+                updated_count += result.modified_count
+                operations = []
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            updated_count += result.modified_count
+        updated[name] = updated_count
+    return updated
+
+@api_router.post("/search-keys/migrate")
+async def migrate_search_keys(current_user: dict = Depends(get_current_user)):
+    """
+    Recompute the normalized search keys (sus_vorn_key, sus_nachn_key, sus_kl_key,
+    itnr_key) of all students, iPads and assignments. Missing keys are filled in
+    at startup already; this also refreshes keys after a change of the folding.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can run migrations")
+    
+    try:
+        updated = await backfill_search_keys()
+        return {"message": "Search key migration completed", "updated": updated}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
+
+
 # iPad history and details
 @api_router.get("/ipads/{ipad_id}/history")
 async def get_ipad_history(ipad_id: str, current_user: dict = Depends(get_current_user)):
@@ -1964,11 +3662,11 @@ async def get_ipad_history(ipad_id: str, current_user: dict = Depends(get_curren
     assignments = await db.assignments.find({"ipad_id": ipad_id}).to_list(length=None)
     
     # Get all contracts for this iPad
-    contracts = await db.contracts.find({"itnr": ipad["itnr"]}).to_list(length=None)
+    contracts = await find_contract_metadata({"itnr": ipad["itnr"]})
     
     # Parse data safely
     try:
-        ipad_data = iPad(**parse_from_mongo(ipad))
+        ipad_data = iPad(**ipad)
     except Exception as e:
         print(f"Error parsing iPad data: {e}")
         ipad_data = {
@@ -1987,53 +3685,18 @@ async def get_ipad_history(ipad_id: str, current_user: dict = Depends(get_curren
         }
     
     try:
-        assignment_data = [Assignment(**parse_from_mongo(a)) for a in assignments]
+        assignment_data = [Assignment(**a) for a in assignments]
     except Exception as e:
         print(f"Error parsing assignment data: {e}")
         assignment_data = []
         for a in assignments:
             try:
-                assignment_data.append(Assignment(**parse_from_mongo(a)))
+                assignment_data.append(Assignment(**a))
             except Exception as ae:
                 print(f"Skipping assignment {a.get('id')}: {ae}")
                 continue
     
-    try:
-        contract_data = []
-        for c in contracts:
-            try:
-                # Handle contracts without file_data for display
-                contract_dict = {
-                    "id": c.get("id"),
-                    "assignment_id": c.get("assignment_id"),  # Can be None
-                    "itnr": c.get("itnr"),  # Can be None  
-                    "student_name": c.get("student_name"),  # Can be None
-                    "filename": c.get("filename"),
-                    "form_fields": c.get("form_fields", {}),
-                    "uploaded_at": c.get("uploaded_at"),
-                    "is_active": c.get("is_active", True),
-                    "file_data": b""  # Empty for history display
-                }
-                
-                # Create contract object safely
-                contract_obj = Contract(
-                    id=contract_dict["id"],
-                    assignment_id=contract_dict["assignment_id"],
-                    itnr=contract_dict["itnr"],
-                    student_name=contract_dict["student_name"],
-                    filename=contract_dict["filename"],
-                    file_data=contract_dict["file_data"],
-                    form_fields=contract_dict["form_fields"],
-                    uploaded_at=contract_dict["uploaded_at"],
-                    is_active=contract_dict["is_active"]
-                )
-                contract_data.append(contract_obj.dict())
-            except Exception as ce:
-                print(f"Skipping contract {c.get('id')}: {ce}")
-                continue
-    except Exception as e:
-        print(f"Error parsing contract data: {e}")
-        contract_data = []
+    contract_data = [contract_summary(c) for c in contracts]
     
     return {
         "ipad": ipad_data,
@@ -2042,49 +3705,85 @@ async def get_ipad_history(ipad_id: str, current_user: dict = Depends(get_curren
     }
 
 # Assignment dissolution
+# Dissolving sets the assignments inactive, moves their contracts to the
+# history and frees the iPads and students: four set-based update_many calls
+# keyed by id lists, whatever the number of assignments. On a replica set
+# (or mongos) they run in one transaction, so a failure cannot leave iPads
+# freed whose assignment is still active.
+MONGO_TRANSACTIONS = os.environ.get("MONGO_TRANSACTIONS", "auto").lower()  # auto | off
+DISSOLVE_PROJECTION = {"_id": 0, "id": 1, "itnr": 1, "ipad_id": 1, "student_id": 1, "contract_id": 1, "user_id": 1}
+_transactions_available: Optional[bool] = None
+
+async def transactions_available() -> bool:
+    """Multi-document transactions need a replica set or a sharded cluster"""
+    global _transactions_available
+    if MONGO_TRANSACTIONS == "off":
+        return False
+    if _transactions_available is None:
+        try:
+            hello = await client.admin.command("hello")
+            _transactions_available = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+        except Exception as e:
+            print(f"Could not detect replica set, running without transactions: {e}")
+            _transactions_available = False
+    return _transactions_available
+
+async def dissolve_assignment_set(assignments: List[dict]) -> dict:
+    """Dissolve `assignments` (DISSOLVE_PROJECTION fields) with at most four update_many calls"""
+    now = datetime.now(timezone.utc)
+    assignment_ids = [a["id"] for a in assignments]
+    contract_ids = [a["contract_id"] for a in assignments if a.get("contract_id")]
+    ipad_ids = [a["ipad_id"] for a in assignments]
+    student_ids = [a["student_id"] for a in assignments]
+    
+    async def apply(session=None) -> dict:
+        modified = {}
+        if contract_ids:
+            result = await db.contracts.update_many(
+                {"id": {"$in": contract_ids}},
+                {"$set": {"is_active": False, "updated_at": now}},
+                session=session
+            )
+            modified["contracts"] = result.modified_count
+        result = await db.assignments.update_many(
+            {"id": {"$in": assignment_ids}},
+            {"$set": {"is_active": False, "unassigned_at": now, "updated_at": now}},
+            session=session
+        )
+        modified["assignments"] = result.modified_count
+        result = await db.ipads.update_many(
+            {"id": {"$in": ipad_ids}},
+            {"$set": {"current_assignment_id": None, "updated_at": now}},
+            session=session
+        )
+        modified["ipads"] = result.modified_count
+        result = await db.students.update_many(
+            {"id": {"$in": student_ids}},
+            {"$set": {"current_assignment_id": None, "updated_at": now}},
+            session=session
+        )
+        modified["students"] = result.modified_count
+        return modified
+    
+    if not await transactions_available():
+        return {"transaction": False, "modified": await apply()}
+    
+    async with await client.start_session() as session:
+        # with_transaction retries on TransientTransactionError / unknown commit result
+        modified = await session.with_transaction(apply)
+    return {"transaction": True, "modified": modified}
+
 @api_router.delete("/assignments/{assignment_id}")
 async def dissolve_assignment(assignment_id: str, current_user: dict = Depends(get_current_user)):
     # Validate resource ownership
     await validate_resource_ownership("assignment", assignment_id, current_user)
     
-    assignment = await db.assignments.find_one({"id": assignment_id})
+    assignment = await db.assignments.find_one({"id": assignment_id}, DISSOLVE_PROJECTION)
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    # Move contract to history if exists
-    if assignment.get("contract_id"):
-        await db.contracts.update_one(
-            {"id": assignment["contract_id"]},
-            {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
-    
-    # Mark assignment as inactive
-    await db.assignments.update_one(
-        {"id": assignment_id},
-        {"$set": {
-            "is_active": False,
-            "unassigned_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    # Update iPad status to available
-    await db.ipads.update_one(
-        {"id": assignment["ipad_id"]},
-        {"$set": {
-            "current_assignment_id": None,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    # Update student
-    await db.students.update_one(
-        {"id": assignment["student_id"]},
-        {"$set": {
-            "current_assignment_id": None,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
+    await dissolve_assignment_set([assignment])
+    await bump_data_version(assignment.get("user_id"))
     
     return {"message": "Assignment dissolved successfully"}
 
@@ -2103,6 +3802,7 @@ async def batch_dissolve_assignments(
     - "sus_nachn": string (filter by student last name)
     - "sus_kl": string (filter by class)
     - "itnr": string (filter by iPad IT number)
+    - "exact": true (values must match completely instead of by prefix)
     """
     try:
         # Apply user filter - CRITICAL for RBAC!
@@ -2114,27 +3814,22 @@ async def batch_dissolve_assignments(
         
         # If not "all", apply specific filters
         if not filter_params.get("all", False):
-            # Build student filter if student-related params exist
-            student_filter = user_filter.copy()
-            has_student_filter = False
+            exact = bool(filter_params.get("exact", False))
             
-            if filter_params.get("sus_vorn"):
-                student_filter["sus_vorn"] = {"$regex": filter_params["sus_vorn"], "$options": "i"}
-                has_student_filter = True
-            if filter_params.get("sus_nachn"):
-                student_filter["sus_nachn"] = {"$regex": filter_params["sus_nachn"], "$options": "i"}
-                has_student_filter = True
-            if filter_params.get("sus_kl"):
-                student_filter["sus_kl"] = {"$regex": filter_params["sus_kl"], "$options": "i"}
-                has_student_filter = True
+            # Build student filter if student-related params exist
+            student_search = compile_search_filter(
+                {field: filter_params.get(field) for field in ("sus_vorn", "sus_nachn", "sus_kl")},
+                exact=exact
+            )
+            student_filter = {**user_filter, **student_search}
+            has_student_filter = bool(student_search)
             
             # Apply iPad filter if provided
-            if filter_params.get("itnr"):
-                assignment_filter["itnr"] = {"$regex": filter_params["itnr"], "$options": "i"}
+            assignment_filter.update(compile_search_filter({"itnr": filter_params.get("itnr")}, exact=exact))
             
             # If student filters exist, get matching student IDs
             if has_student_filter:
-                students = await db.students.find(student_filter).to_list(length=None)
+                students = await db.students.find(student_filter, {"_id": 0, "id": 1}).to_list(length=None)
                 student_ids = [s["id"] for s in students]
                 
                 if not student_ids:
@@ -2147,7 +3842,7 @@ async def batch_dissolve_assignments(
                 assignment_filter["student_id"] = {"$in": student_ids}
         
         # Get all matching assignments
-        assignments = await db.assignments.find(assignment_filter).to_list(length=None)
+        assignments = await db.assignments.find(assignment_filter, DISSOLVE_PROJECTION).to_list(length=None)
         
         if not assignments:
             return {
@@ -2156,57 +3851,42 @@ async def batch_dissolve_assignments(
                 "details": []
             }
         
-        dissolved_count = 0
-        details = []
+        try:
+            outcome = await dissolve_assignment_set(assignments)
+        except Exception as e:
+            if await transactions_available():
+                dissolved_ids = set()  # Rolled back
+            else:
+                # Some of the update_many calls may have been applied: report what is stored
+                still_active = await db.assignments.find(
+                    {"id": {"$in": [a["id"] for a in assignments]}, "is_active": True},
+                    {"_id": 0, "id": 1}
+                ).to_list(length=None)
+                still_active_ids = {a["id"] for a in still_active}
+                dissolved_ids = {a["id"] for a in assignments if a["id"] not in still_active_ids}
+            if dissolved_ids:
+                await bump_data_version(user_filter.get("user_id"))
+            return {
+                "message": f"Error during batch dissolve, {len(dissolved_ids)} of {len(assignments)} assignment(s) dissolved",
+                "dissolved_count": len(dissolved_ids),
+                "total_found": len(assignments),
+                "details": [
+                    f"Assignment {a.get('itnr', 'Unknown')} dissolved" if a["id"] in dissolved_ids
+                    else f"Error dissolving assignment {a.get('itnr', 'Unknown')}: {str(e)}"
+                    for a in assignments
+                ]
+            }
         
-        # Dissolve each assignment
-        for assignment in assignments:
-            try:
-                # Move contract to history if exists
-                if assignment.get("contract_id"):
-                    await db.contracts.update_one(
-                        {"id": assignment["contract_id"]},
-                        {"$set": {"is_active": False, "updated_at": datetime.now(timezone.utc).isoformat()}}
-                    )
-                
-                # Mark assignment as inactive
-                await db.assignments.update_one(
-                    {"id": assignment["id"]},
-                    {"$set": {
-                        "is_active": False,
-                        "unassigned_at": datetime.now(timezone.utc).isoformat(),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                
-                # Update iPad status to available
-                await db.ipads.update_one(
-                    {"id": assignment["ipad_id"]},
-                    {"$set": {
-                        "current_assignment_id": None,
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                
-                # Update student
-                await db.students.update_one(
-                    {"id": assignment["student_id"]},
-                    {"$set": {
-                        "current_assignment_id": None,
-                        "updated_at": datetime.now(timezone.utc).isoformat()
-                    }}
-                )
-                
-                dissolved_count += 1
-                details.append(f"Assignment {assignment.get('itnr', 'Unknown')} dissolved")
-                
-            except Exception as e:
-                details.append(f"Error dissolving assignment {assignment.get('itnr', 'Unknown')}: {str(e)}")
+        dissolved_count = len(assignments)
+        details = [f"Assignment {a.get('itnr', 'Unknown')} dissolved" for a in assignments]
+        await bump_data_version(user_filter.get("user_id"))
         
         return {
             "message": f"Successfully dissolved {dissolved_count} assignment(s)",
             "dissolved_count": dissolved_count,
             "total_found": len(assignments),
+            "transaction": outcome["transaction"],
+            "modified": outcome["modified"],
             "details": details
         }
         
@@ -2219,7 +3899,7 @@ async def batch_dissolve_assignments(
 # Contract viewing
 @api_router.get("/contracts/{contract_id}")
 async def get_contract(contract_id: str, current_user: dict = Depends(get_current_user)):
-    contract = await db.contracts.find_one({"id": contract_id})
+    contract = await get_contract_metadata(contract_id)
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
     
@@ -2235,30 +3915,128 @@ async def get_contract(contract_id: str, current_user: dict = Depends(get_curren
 
 @api_router.get("/contracts/{contract_id}/download")
 async def download_contract(contract_id: str, current_user: dict = Depends(get_current_user)):
-    contract = await db.contracts.find_one({"id": contract_id})
+    contract = await get_contract_metadata(contract_id, fields=["filename", "file_id"])
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
     
-    return StreamingResponse(
-        io.BytesIO(contract["file_data"]),
-        media_type='application/pdf',
-        headers={"Content-Disposition": f"attachment; filename={contract['filename']}"}
-    )
+    headers = {"Content-Disposition": f"attachment; filename={contract['filename']}"}
+    
+    if not contract.get("file_id"):
+        # Legacy contract not migrated to GridFS yet: the only place that reads the blob
+        legacy = await db.contracts.find_one({"id": contract_id}, {"_id": 0, "file_data": 1})
+        if not legacy or legacy.get("file_data") is None:
+            raise HTTPException(status_code=404, detail="Contract file not found")
+        return StreamingResponse(io.BytesIO(legacy["file_data"]), media_type='application/pdf', headers=headers)
+    
+    try:
+        grid_out = await contract_files.open_download_stream(contract["file_id"])
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Contract file not found")
+    
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(iter_contract_file(grid_out), media_type='application/pdf', headers=headers)
 
 @api_router.delete("/contracts/{contract_id}")
 async def delete_contract(contract_id: str, current_user: dict = Depends(get_current_user)):
-    contract = await db.contracts.find_one({"id": contract_id})
+    contract = await get_contract_metadata(contract_id, fields=["id", "file_id"])
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
     
     # Delete the contract
     result = await db.contracts.delete_one({"id": contract_id})
+    await release_contract_file(contract.get("file_id"))
+    await db.assignments.update_many(
+        {"contract_id": contract_id, "contract_warning": True},
+        {"$set": {"contract_warning": False}}
+    )
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Contract not found")
     
     return {"message": "Contract deleted successfully"}
 
+@api_router.post("/contracts/migrate-files")
+async def migrate_contract_files(current_user: dict = Depends(get_current_user)):
+    """
+    Online migration: move inline contract PDFs (file_data) to GridFS.
+    Works in small batches so only a few PDFs are in memory at once; downloads
+    keep working during the migration because legacy contracts are still served
+    from file_data until their reference is swapped in.
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can run migrations")
+    
+    migrated_count = 0
+    migrated_bytes = 0
+    failed_ids = []
+    
+    try:
+        while True:
+            batch = await db.contracts.find(
+                {"file_data": {"$exists": True, "$ne": None}, "id": {"$nin": failed_ids}},
+                {"_id": 0, "id": 1, "user_id": 1, "filename": 1, "file_data": 1, "form_fields": 1}
+            ).limit(CONTRACT_MIGRATION_BATCH_SIZE).to_list(length=CONTRACT_MIGRATION_BATCH_SIZE)
+            if not batch:
+                break
+            
+            for contract in batch:
+                try:
+                    contents = bytes(contract["file_data"])
+                    file_ref, _ = await store_contract_file(
+                        contract.get("filename", "contract.pdf"), contents, contract.get("user_id"),
+                        form_fields=contract.get("form_fields") or {}
+                    )
+                    # Only swap if the blob is still there (contract may have been deleted meanwhile)
+                    result = await db.contracts.update_one(
+                        {"id": contract["id"], "file_data": {"$exists": True}},
+                        {"$set": file_ref, "$unset": {"file_data": ""}}
+                    )
+                    if result.modified_count:
+                        migrated_count += 1
+                        migrated_bytes += file_ref["file_size"]
+                    else:
+                        await release_contract_file(file_ref["file_id"])
+                except Exception as e:
+                    print(f"Contract {contract.get('id')} could not be migrated: {e}")
+                    failed_ids.append(contract["id"])
+        
+        return {
+            "message": "Contract file migration completed",
+            "migrated_count": migrated_count,
+            "migrated_bytes": migrated_bytes,
+            "failed_count": len(failed_ids),
+            "failed_ids": failed_ids
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Migration error: {str(e)}")
+
+@api_router.get("/admin/contracts/storage")
+async def get_contract_storage_report(current_user: dict = Depends(get_current_user)):
+    """Admin report: stored contract PDFs and bytes saved by deduplication"""
+    require_admin(current_user)
+    
+    stats = await db.contract_blobs.aggregate([
+        {"$group": {
+            "_id": None,
+            "stored_files": {"$sum": 1},
+            "references": {"$sum": "$ref_count"},
+            "stored_bytes": {"$sum": "$size"},
+            # Bytes the current references would need without sharing
+            "saved_bytes": {"$sum": {"$multiply": ["$size", {"$subtract": ["$ref_count", 1]}]}},
+            "deduplicated_uploads": {"$sum": "$dedup_hits"},
+            # Bytes not written (and PDFs not parsed) since deduplication was introduced
+            "upload_bytes_avoided": {"$sum": {"$multiply": ["$size", "$dedup_hits"]}}
+        }}
+    ]).to_list(length=1)
+    report = stats[0] if stats else {
+        "stored_files": 0, "references": 0, "stored_bytes": 0,
+        "saved_bytes": 0, "deduplicated_uploads": 0, "upload_bytes_avoided": 0
+    }
+    report.pop("_id", None)
+    report["legacy_inline_contracts"] = await db.contracts.count_documents({"file_data": {"$exists": True, "$ne": None}})
+    return report
+
 # Global Settings endpoints
 @api_router.get("/settings/global")
 async def get_global_settings(current_user: dict = Depends(get_current_user)):
@@ -2271,10 +4049,11 @@ async def get_global_settings(current_user: dict = Depends(get_current_user)):
                 "type": "app_settings",
                 "ipad_typ": "Apple iPad",
                 "pencil": "ohne Apple Pencil",
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "created_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
             }
             await db.global_settings.insert_one(default_settings)
+            await bump_data_version(None)
             settings = default_settings
         
         return {
@@ -2297,7 +4076,7 @@ async def update_global_settings(
         update_data = {
             "ipad_typ": ipad_typ,
             "pencil": pencil,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
         
         result = await db.global_settings.update_one(
@@ -2306,6 +4085,8 @@ async def update_global_settings(
             upsert=True
         )
         
+        await bump_data_version(None)
+        
         return {
             "message": "Einstellungen erfolgreich aktualisiert",
             "ipad_typ": ipad_typ,
@@ -2314,9 +4095,270 @@ async def update_global_settings(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating settings: {str(e)}")
 
+class InventoryImportPlanner:
+    """
+    In-memory create/link plan for a Bestandsliste import.
+    
+    Phase 1 (prefetch) is load_inventory_import_planner(): three queries for the
+    user's iPads, students and the active assignments of those iPads.
+    Phase 2 is add_row() for every sheet row, which only updates in-memory
+    state and queues documents. Phase 3 is apply_inventory_operations() with
+    the documents returned by take_operations(); rows can be added and
+    flushed in chunks because the planner remembers what it already queued.
+    """
+    
+    def __init__(self, user_id: str, ipads_by_itnr: Dict[str, str], students_by_key: Dict[tuple, str], assigned_ipad_ids: set):
+        self.user_id = user_id
+        self.ipads_by_itnr = ipads_by_itnr
+        self.students_by_key = students_by_key
+        self.assigned_ipad_ids = assigned_ipad_ids
+        
+        self.ipads_created = 0
+        self.ipads_skipped = 0
+        self.students_created = 0
+        self.students_skipped = 0
+        self.assignments_created = 0
+        self.error_count = 0
+        self.errors = []
+        
+        # Documents queued for insertion but not flushed yet
+        self._ipad_docs = []
+        self._student_docs = []
+        self._assignment_docs = []
+    
+    def add_row(self, row_number: int, row: Dict[str, str]):
+        try:
+            self._plan_row(row)
+        except Exception as e:
+            self.error_count += 1
+            self.errors.append(f"Row {row_number}: {str(e)}")
+    
+    def _plan_row(self, row: Dict[str, str]):
+        itnr = row['itnr']
+        if not itnr:
+            return  # Skip rows without ITNr
+        
+        ipad_id = self.ipads_by_itnr.get(itnr)
+        if ipad_id:
+            self.ipads_skipped += 1
+        else:
+            new_ipad = iPad(
+                user_id=self.user_id,
+                itnr=itnr,
+                snr=row['snr'],
+                typ=row['typ'],
+                pencil=row['pencil'],
+                ansch_jahr=row['anschjahr'],
+                status="ok"  # Default status for imported iPads
+            )
+            ipad_id = new_ipad.id
+            self.ipads_by_itnr[itnr] = ipad_id
+            self._ipad_docs.append(prepare_for_mongo(new_ipad.dict()))
+            self.ipads_created += 1
+        
+        sus_vorn = row['susvorn']
+        sus_nachn = row['susnachn']
+        sus_kl = row['suskl']
+        if not (sus_vorn and sus_nachn):
+            return  # No student data present - iPad remains available
+        
+        student_key = (sus_vorn, sus_nachn, sus_kl)
+        student_id = self.students_by_key.get(student_key)
+        if student_id:
+            self.students_skipped += 1
+        else:
+            new_student = Student(
+                user_id=self.user_id,
+                **student_fields_from_row(row)
+            )
+            student_id = new_student.id
+            self.students_by_key[student_key] = student_id
+            self._student_docs.append(prepare_for_mongo(new_student.dict()))
+            self.students_created += 1
+        
+        if ipad_id in self.assigned_ipad_ids:
+            return  # iPad already has an active assignment
+        
+        assigned_at = datetime.now(timezone.utc)
+        if row['ausleihedatum']:
+            try:
+                # Parse DD.MM.YYYY format
+                date_obj = datetime.strptime(row['ausleihedatum'], "%d.%m.%Y")
+                assigned_at = date_obj.replace(tzinfo=timezone.utc)
+            except ValueError:
+                pass  # Use current datetime if parsing fails
+        
+        new_assignment = Assignment(
+            user_id=self.user_id,
+            ipad_id=ipad_id,
+            student_id=student_id,
+            itnr=itnr,
+            student_name=f"{sus_vorn} {sus_nachn}",
+            assigned_at=assigned_at
+        )
+        # iPad and student are linked once the assignment is written
+        self._assignment_docs.append(prepare_for_mongo(new_assignment.dict()))
+        self.assigned_ipad_ids.add(ipad_id)
+        self.assignments_created += 1
+    
+    def take_operations(self):
+        """Return the queued (ipad, student, assignment) documents and reset the queues"""
+        operations = (self._ipad_docs, self._student_docs, self._assignment_docs)
+        self._ipad_docs, self._student_docs, self._assignment_docs = [], [], []
+        return operations
+    
+    def discard_failed(self, failed_ipad_ids: set, failed_student_ids: set, dropped_assignments: List[dict]):
+        """Forget documents that could not be written, later rows must not reference them"""
+        self.ipads_created -= len(failed_ipad_ids)
+        self.students_created -= len(failed_student_ids)
+        self.assignments_created -= len(dropped_assignments)
+        if failed_ipad_ids:
+            self.ipads_by_itnr = {itnr: ipad_id for itnr, ipad_id in self.ipads_by_itnr.items() if ipad_id not in failed_ipad_ids}
+        if failed_student_ids:
+            self.students_by_key = {key: student_id for key, student_id in self.students_by_key.items() if student_id not in failed_student_ids}
+        for assignment in dropped_assignments:
+            self.assigned_ipad_ids.discard(assignment["ipad_id"])
+    
+    def restore(self, summary: dict):
+        """Continue the counters of a previously persisted summary() (resumed job)"""
+        for counter in ("ipads_created", "ipads_skipped", "students_created", "students_skipped", "assignments_created", "error_count"):
+            setattr(self, counter, summary.get(counter, 0))
+        self.errors = list(summary.get("errors", []))
+    
+    def summary(self) -> dict:
+        total_processed = self.ipads_created + self.ipads_skipped
+        message = f"Import completed: {self.ipads_created} iPads created, {self.ipads_skipped} iPads skipped, {self.students_created} students created, {self.students_skipped} students skipped, {self.assignments_created} assignments created"
+        
+        if self.error_count > 0:
+            message += f", {self.error_count} errors"
+        
+        return {
+            "message": message,
+            "total_processed": total_processed,
+            "ipads_created": self.ipads_created,
+            "ipads_skipped": self.ipads_skipped,
+            "students_created": self.students_created,
+            "students_skipped": self.students_skipped,
+            "assignments_created": self.assignments_created,
+            "error_count": self.error_count,
+            "errors": self.errors[:10] if self.errors else []  # Limit error list to first 10
+        }
+
+async def load_inventory_import_planner(user_id: str) -> InventoryImportPlanner:
+    """Prefetch the user's iPads, students and active assignments (three queries)"""
+    ipads, students = await asyncio.gather(
+        db.ipads.find({"user_id": user_id}, {"_id": 0, "id": 1, "itnr": 1}).to_list(length=None),
+        db.students.find(
+            {"user_id": user_id},
+            {"_id": 0, "id": 1, "sus_vorn": 1, "sus_nachn": 1, "sus_kl": 1}
+        ).to_list(length=None)
+    )
+    ipads_by_itnr = {}
+    for ipad in ipads:
+        ipads_by_itnr.setdefault(ipad["itnr"], ipad["id"])
+    students_by_key = {}
+    for student in students:
+        key = (student.get("sus_vorn"), student.get("sus_nachn"), student.get("sus_kl"))
+        students_by_key.setdefault(key, student["id"])
+    
+    active_assignments = await db.assignments.find(
+        {"ipad_id": {"$in": list(ipads_by_itnr.values())}, "is_active": True},
+        {"_id": 0, "ipad_id": 1}
+    ).to_list(length=None)
+    assigned_ipad_ids = {a["ipad_id"] for a in active_assignments}
+    
+    return InventoryImportPlanner(user_id, ipads_by_itnr, students_by_key, assigned_ipad_ids)
+
+async def insert_planned_documents(planner: InventoryImportPlanner, collection, docs: List[dict]) -> set:
+    """Unordered bulk insert; returns the ids of the documents that were not written"""
+    if not docs:
+        return set()
+    try:
+        await collection.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+    except BulkWriteError as e:
+        failed = set()
+        for write_error in e.details.get("writeErrors", []):
+            failed.add(docs[write_error["index"]]["id"])
+            planner.error_count += 1
+            planner.errors.append(f"{collection.name}: {write_error.get('errmsg', 'write failed')}")
+        return failed
+    return set()
+
+async def apply_inventory_operations(planner: InventoryImportPlanner):
+    """
+    Write everything the planner queued: inserts of iPads and students, then the
+    assignments whose iPad and student exist, then one bulk link update each for
+    iPads and students. Rows whose documents failed are dropped with their links.
+    """
+    ipad_docs, student_docs, assignment_docs = planner.take_operations()
+    if not (ipad_docs or student_docs or assignment_docs):
+        return
+    
+    failed_ipads = await insert_planned_documents(planner, db.ipads, ipad_docs)
+    failed_students = await insert_planned_documents(planner, db.students, student_docs)
+    planned = [a for a in assignment_docs if a["ipad_id"] not in failed_ipads and a["student_id"] not in failed_students]
+    failed_assignments = await insert_planned_documents(planner, db.assignments, planned)
+    written = [a for a in planned if a["id"] not in failed_assignments]
+    written_ids = {a["id"] for a in written}
+    planner.discard_failed(failed_ipads, failed_students, [a for a in assignment_docs if a["id"] not in written_ids])
+    
+    if written:
+        now = datetime.now(timezone.utc)
+        await db.ipads.bulk_write([
+            UpdateOne({"id": a["ipad_id"]}, {"$set": {"status": "zugewiesen", "current_assignment_id": a["id"], "updated_at": now}})
+            for a in written
+        ], ordered=False)
+        await db.students.bulk_write([
+            UpdateOne({"id": a["student_id"]}, {"$set": {"current_assignment_id": a["id"], "updated_at": now}})
+            for a in written
+        ], ordered=False)
+    await bump_data_version(planner.user_id)
+
+async def ingest_inventory(contents: bytes, filename: str, user_id: str, dry_run: bool = False, progress: Optional["JobProgress"] = None) -> dict:
+    """Plan and apply a Bestandsliste import, flushing the plan every JOB_CHUNK_SIZE rows"""
+    _, rows = read_spreadsheet_rows(contents, filename, INVENTORY_IPAD_COLUMNS + list(STUDENT_COLUMNS))
+    
+    planner = await load_inventory_import_planner(user_id)
+    rows_done = 0
+    if progress:
+        rows_done = progress.rows_done
+        if progress.result:
+            planner.restore(progress.result)
+        if rows_done:
+            rows = itertools.islice(rows, rows_done, None)
+    
+    for row_number, row in rows:
+        planner.add_row(row_number, row)
+        rows_done += 1
+        if progress and rows_done % JOB_CHUNK_SIZE == 0:
+            if not dry_run:
+                await apply_inventory_operations(planner)
+            await progress.update(rows_done, planner.summary())
+    
+    if not dry_run:
+        await apply_inventory_operations(planner)
+    result = planner.summary()
+    if dry_run:
+        result["message"] = result["message"].replace("Import completed", "Dry run", 1)
+        result["dry_run"] = True
+    if progress:
+        await progress.update(rows_done, result)
+    return result
+
 @api_router.post("/imports/inventory")
-async def import_inventory(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    """Import complete inventory list with iPads and student assignments from Excel file"""
+async def import_inventory(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    background: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import complete inventory list with iPads and student assignments from Excel file
+    
+    With dry_run=true the import plan is computed and its counts are returned
+    without writing anything. With background=true a job id is returned at
+    once and the import runs as a background job (see /jobs/{job_id}).
+    """
     try:
         # Validate file type
         if not file.filename.lower().endswith(('.xlsx', '.xls')):
@@ -2327,215 +4369,287 @@ async def import_inventory(file: UploadFile = File(...), current_user: dict = De
         # Security: Validate uploaded file
         validate_uploaded_file(contents, file.filename, max_size_mb=10, allowed_types=['.xlsx', '.xls'])
         
-        # Try to read with different engines for .xls/.xlsx support
+        # Only the known iPad/student columns are read (.xlsx via openpyxl, .xls via xlrd)
         try:
-            if file.filename.lower().endswith('.xlsx'):
-                df = pd.read_excel(io.BytesIO(contents), engine='openpyxl')
-            else:
-                df = pd.read_excel(io.BytesIO(contents), engine='xlrd')
+            present_columns, _ = read_spreadsheet_rows(
+                contents, file.filename, INVENTORY_IPAD_COLUMNS + list(STUDENT_COLUMNS)
+            )
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error reading Excel file: {str(e)}")
         
         # Validate required iPad columns
         required_ipad_columns = ['ITNr']
-        missing_columns = [col for col in required_ipad_columns if col not in df.columns]
+        missing_columns = [col for col in required_ipad_columns if col.lower() not in present_columns]
         if missing_columns:
             raise HTTPException(status_code=400, detail=f"Missing required columns: {missing_columns}")
         
-        # Counters for different operations
-        ipads_created = 0
-        ipads_updated = 0
-        ipads_skipped = 0
-        students_created = 0
-        students_skipped = 0
-        assignments_created = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Process iPad data
-                itnr = str(row.get('ITNr', '')).strip()
-                if not itnr:
-                    continue  # Skip rows without ITNr
-                
-                # Check if iPad already exists for this user
-                existing_ipad = await db.ipads.find_one({"itnr": itnr, "user_id": current_user["id"]})
-                
-                if existing_ipad:
-                    ipads_skipped += 1
-                    ipad_id = existing_ipad["id"]
-                else:
-                    # Create new iPad
-                    new_ipad = iPad(
-                        user_id=current_user["id"],
-                        itnr=itnr,
-                        snr=str(row.get('SNr', '')).strip(),
-                        typ=str(row.get('Typ', '')).strip(),
-                        pencil=str(row.get('Pencil', '')).strip(),
-                        ansch_jahr=str(row.get('AnschJahr', '')).strip(),
-                        status="ok"  # Default status for imported iPads
-                    )
-                    
-                    ipad_dict = prepare_for_mongo(new_ipad.dict())
-                    await db.ipads.insert_one(ipad_dict)
-                    ipad_id = new_ipad.id
-                    ipads_created += 1
-                
-                # Check if student data exists in row (and is not NaN)
-                sus_vorn_raw = row.get('SuSVorn', '')
-                sus_nachn_raw = row.get('SuSNachn', '')
-                sus_kl_raw = row.get('SuSKl', '')
-                
-                # Handle NaN values from pandas
-                sus_vorn = str(sus_vorn_raw).strip() if pd.notna(sus_vorn_raw) else ''
-                sus_nachn = str(sus_nachn_raw).strip() if pd.notna(sus_nachn_raw) else ''
-                sus_kl = str(sus_kl_raw).strip() if pd.notna(sus_kl_raw) else ''
-                
-                if sus_vorn and sus_nachn and sus_vorn != 'nan' and sus_nachn != 'nan':  # Student data present and valid
-                    # Check if student already exists for this user (by name + class + user_id)
-                    existing_student = await db.students.find_one({
-                        "sus_vorn": sus_vorn,
-                        "sus_nachn": sus_nachn,
-                        "sus_kl": sus_kl,
-                        "user_id": current_user["id"]
-                    })
-                    
-                    if existing_student:
-                        students_skipped += 1
-                        student_id = existing_student["id"]
-                    else:
-                        # Helper function to safely convert values and handle NaN
-                        def safe_str(value):
-                            if pd.isna(value) or value is None:
-                                return ''
-                            str_val = str(value).strip()
-                            return '' if str_val == 'nan' else str_val
-                        
-                        # Create new student with proper NaN handling
-                        new_student = Student(
-                            user_id=current_user["id"],
-                            sname=safe_str(row.get('Sname', '')),
-                            sus_vorn=sus_vorn,
-                            sus_nachn=sus_nachn,
-                            sus_kl=sus_kl,
-                            sus_str_hnr=safe_str(row.get('SuSStrHNr', '')),
-                            sus_plz=safe_str(row.get('SuSPLZ', '')),
-                            sus_ort=safe_str(row.get('SuSOrt', '')),
-                            sus_geb=safe_str(row.get('SuSGeb', '')),
-                            erz1_nachn=safe_str(row.get('Erz1Nachn', '')),
-                            erz1_vorn=safe_str(row.get('Erz1Vorn', '')),
-                            erz1_str_hnr=safe_str(row.get('Erz1StrHNr', '')),
-                            erz1_plz=safe_str(row.get('Erz1PLZ', '')),
-                            erz1_ort=safe_str(row.get('Erz1Ort', '')),
-                            erz2_nachn=safe_str(row.get('Erz2Nachn', '')),
-                            erz2_vorn=safe_str(row.get('Erz2Vorn', '')),
-                            erz2_str_hnr=safe_str(row.get('Erz2StrHNr', '')),
-                            erz2_plz=safe_str(row.get('Erz2PLZ', '')),
-                            erz2_ort=safe_str(row.get('Erz2Ort', ''))
-                        )
-                        
-                        student_dict = prepare_for_mongo(new_student.dict())
-                        await db.students.insert_one(student_dict)
-                        student_id = new_student.id
-                        students_created += 1
-                    
-                    # Check if assignment already exists
-                    existing_assignment = await db.assignments.find_one({
-                        "ipad_id": ipad_id,
-                        "is_active": True
-                    })
-                    
-                    if not existing_assignment:
-                        # Create new assignment
-                        ausleibe_datum = str(row.get('AusleiheDatum', '')).strip()
-                        assigned_at = datetime.now(timezone.utc).isoformat()
-                        
-                        # Try to parse AusleiheDatum if provided
-                        if ausleibe_datum:
-                            try:
-                                # Parse DD.MM.YYYY format
-                                date_obj = datetime.strptime(ausleibe_datum, "%d.%m.%Y")
-                                assigned_at = date_obj.replace(tzinfo=timezone.utc).isoformat()
-                            except:
-                                pass  # Use current datetime if parsing fails
-                        
-                        new_assignment = Assignment(
-                            user_id=current_user["id"],
-                            ipad_id=ipad_id,
-                            student_id=student_id,
-                            itnr=itnr,
-                            student_name=f"{sus_vorn} {sus_nachn}",
-                            assigned_at=assigned_at
-                        )
-                        
-                        assignment_dict = prepare_for_mongo(new_assignment.dict())
-                        await db.assignments.insert_one(assignment_dict)
-                        
-                        # Update iPad status and assignment reference
-                        await db.ipads.update_one(
-                            {"id": ipad_id},
-                            {"$set": {
-                                "status": "zugewiesen",
-                                "current_assignment_id": new_assignment.id,
-                                "updated_at": datetime.now(timezone.utc).isoformat()
-                            }}
-                        )
-                        
-                        # Update student assignment reference
-                        await db.students.update_one(
-                            {"id": student_id},
-                            {"$set": {
-                                "current_assignment_id": new_assignment.id,
-                                "updated_at": datetime.now(timezone.utc).isoformat()
-                            }}
-                        )
-                        
-                        assignments_created += 1
-                # If no student data, ensure iPad stays available
-                else:
-                    # No student data present - iPad should remain available
-                    if not existing_ipad:  # Only update status if this is a newly created iPad
-                        await db.ipads.update_one(
-                            {"id": ipad_id},
-                            {"$set": {
-                                "current_assignment_id": None,
-                                "updated_at": datetime.now(timezone.utc).isoformat()
-                            }}
-                        )
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Row {index + 2}: {str(e)}")
-                continue
-        
-        # Prepare response
-        total_processed = ipads_created + ipads_skipped
-        message = f"Import completed: {ipads_created} iPads created, {ipads_skipped} iPads skipped, {students_created} students created, {students_skipped} students skipped, {assignments_created} assignments created"
-        
-        if error_count > 0:
-            message += f", {error_count} errors"
+        if background:
+            job = await job_runner.submit(
+                "inventory_import", current_user, file.filename, contents, options={"dry_run": dry_run}
+            )
+            return JSONResponse(status_code=202, content=jsonable_encoder(job))
         
-        return {
-            "message": message,
-            "total_processed": total_processed,
-            "ipads_created": ipads_created,
-            "ipads_skipped": ipads_skipped,
-            "students_created": students_created,
-            "students_skipped": students_skipped,
-            "assignments_created": assignments_created,
-            "error_count": error_count,
-            "errors": errors[:10] if errors else []  # Limit error list to first 10
-        }
+        return await ingest_inventory(contents, file.filename, current_user["id"], dry_run=dry_run)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing inventory import: {str(e)}")
 
+# Data versions and export cache
+# Every mutation on ipads, students, assignments or global_settings bumps a
+# counter in `data_versions`: the owning user's counter (or the shared one if
+# the change can affect every tenant) and the global one used for admins.
+# Exports are cached under (user, endpoint, filters, format, version).
+DATA_VERSION_ALL = "__all__"
+DATA_VERSION_SHARED = "__shared__"
+
+async def bump_data_version(user_id: Optional[str]):
+    """Invalidate cached exports of `user_id` (None: of every tenant)"""
+    keys = [DATA_VERSION_ALL, user_id or DATA_VERSION_SHARED]
+    await db.data_versions.bulk_write(
+        [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in keys],
+        ordered=False
+    )
+
+async def get_data_version(user: dict) -> str:
+    """Version of all data visible to `user` (admins see every tenant)"""
+    keys = [DATA_VERSION_ALL] if is_admin(user) else [user["id"], DATA_VERSION_SHARED]
+    docs = await db.data_versions.find({"_id": {"$in": keys}}).to_list(length=None)
+    versions = {doc["_id"]: doc.get("version", 0) for doc in docs}
+    return ".".join(str(versions.get(key, 0)) for key in keys)
+
+class ExportCache:
+    """In-process LRU cache of finished export files, bounded by total bytes"""
+    
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+    
+    def get(self, key: tuple) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def set(self, key: tuple, body: bytes, media_type: str, headers: dict):
+        if len(body) > self.max_entry_bytes:
+            return
+        if key in self._entries:
+            self.size_bytes -= len(self._entries.pop(key)[0])
+        self._entries[key] = (body, media_type, headers)
+        self.size_bytes += len(body)
+        while self.size_bytes > self.max_bytes and self._entries:
+            evicted_body = self._entries.popitem(last=False)[1][0]
+            self.size_bytes -= len(evicted_body)
+            self.evictions += 1
+    
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "max_entry_bytes": self.max_entry_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+export_cache = ExportCache(
+    max_bytes=int(os.environ.get("EXPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    max_entry_bytes=int(os.environ.get("EXPORT_CACHE_MAX_ENTRY_BYTES", str(16 * 1024 * 1024)))
+)
+
+async def cached_export(request: Request, user: dict, endpoint: str, params: dict, export_format: str,
+                        filename_base: str, build):
+    """
+    Serve an export from the cache or build it with `build()`.
+    
+    The ETag is derived from the cache key, so a client that still has the
+    current version gets a 304 without anything being built. A freshly built
+    response is streamed unchanged and stored in the cache once complete.
+    Cached bodies are served under the current `filename_base` (it may carry
+    a timestamp), not the filename of the response they were built for.
+    """
+    version = await get_data_version(user)
+    key = (user["id"], endpoint, tuple(sorted(params.items())), export_format, version)
+    etag = '"' + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32] + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cache_headers)
+    
+    entry = export_cache.get(key)
+    if entry is not None:
+        body, media_type, headers = entry
+        disposition = {"Content-Disposition": f"attachment; filename={filename_base}.{export_format}"}
+        return Response(content=body, media_type=media_type, headers={**headers, **disposition, **cache_headers})
+    
+    response = await build()
+    media_type = response.media_type
+    body_iterator = response.body_iterator
+    if not hasattr(body_iterator, "__aiter__"):
+        body_iterator = iterate_in_threadpool(body_iterator)
+    
+    async def tee():
+        chunks = []
+        size = 0
+        async for chunk in body_iterator:
+            if chunks is not None:
+                size += len(chunk)
+                if size <= export_cache.max_entry_bytes:
+                    chunks.append(chunk)
+                else:
+                    chunks = None  # Too large to cache, keep streaming
+            yield chunk
+        if chunks is not None:
+            export_cache.set(key, b"".join(chunks), media_type, {})
+    
+    response.body_iterator = tee()
+    response.headers.update(cache_headers)
+    return response
+
+# Export helpers
+# Column order shared by the Bestandsliste and Zuordnungen exports
+EXPORT_COLUMNS = [
+    "Sname", "SuSNachn", "SuSVorn", "SuSKl", "SuSStrHNr", "SuSPLZ", "SuSOrt", "SuSGeb",
+    "Erz1Nachn", "Erz1Vorn", "Erz1StrHNr", "Erz1PLZ", "Erz1Ort",
+    "Erz2Nachn", "Erz2Vorn", "Erz2StrHNr", "Erz2PLZ", "Erz2Ort",
+    "Pencil", "ITNr", "SNr", "Typ", "AnschJahr", "AusleiheDatum", "Rückgabe"
+]
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+async def write_xlsx_export(sheet_name: str, rows) -> str:
+    """
+    Write an async iterator of export rows into a temporary .xlsx file.
+    
+    xlsxwriter runs in constant_memory mode, so every row is flushed to disk
+    as soon as it is written and memory stays flat regardless of row count.
+    Returns the path of the finished file (removed by iter_file_chunks).
+    """
+    handle, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, EXPORT_COLUMNS, workbook.add_format({"bold": True}))
+        
+        row_number = 1
+        async for row in rows:
+            worksheet.write_row(row_number, 0, [row[column] for column in EXPORT_COLUMNS])
+            row_number += 1
+        
+        # Assembling the zip container is blocking file IO
+        await asyncio.get_running_loop().run_in_executor(None, workbook.close)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def iter_file_chunks(path: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield a file in chunks and delete it afterwards"""
+    try:
+        with open(path, "rb") as export_file:
+            while True:
+                chunk = export_file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+def xlsx_file_response(path: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_file_chunks(path),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Content-Length": str(os.path.getsize(path))
+        }
+    )
+
+EXPORT_FORMATS = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+EXPORT_LINES_PER_CHUNK = 100
+
+async def iter_csv_export(rows):
+    """Encode export rows as CSV while they come from the cursor (header first)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    
+    pending = 0
+    async for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        pending += 1
+        if pending == EXPORT_LINES_PER_CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+async def iter_ndjson_export(rows):
+    """Encode export rows as one JSON object per line, keys in export column order"""
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({column: row[column] for column in EXPORT_COLUMNS}, ensure_ascii=False))
+        if len(lines) == EXPORT_LINES_PER_CHUNK:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def validate_export_format(export_format: str) -> str:
+    export_format = export_format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {list(EXPORT_FORMATS)}")
+    return export_format
+
+async def export_response(rows, export_format: str, sheet_name: str, filename_base: str):
+    """Build the download response for an async iterator of export rows"""
+    filename = f"{filename_base}.{export_format}"
+    if export_format == "xlsx":
+        # Rows go straight from the cursor into the workbook
+        path = await write_xlsx_export(sheet_name, rows)
+        return xlsx_file_response(path, filename)
+    
+    # CSV/NDJSON are streamed while the cursor is still being read
+    body = iter_csv_export(rows) if export_format == "csv" else iter_ndjson_export(rows)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @api_router.get("/exports/inventory")
-async def export_inventory(current_user: dict = Depends(get_current_user)):
-    """Export complete inventory list with all iPads and assigned students"""
+async def export_inventory(
+    request: Request,
+    export_format: str = Query("xlsx", alias="format"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Export complete inventory list with all iPads and assigned students (format: xlsx, csv or ndjson)"""
+    export_format = validate_export_format(export_format)
     try:
         # Apply user filter - CRITICAL for RBAC!
         user_filter = await get_user_filter(current_user)
@@ -2592,115 +4706,57 @@ async def export_inventory(current_user: dict = Depends(get_current_user)):
             }
         ]
         
-        ipads_with_data = await db.ipads.aggregate(pipeline).to_list(length=None)
+        cursor = db.ipads.aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE)
         
-        # Prepare export data
-        export_data = []
-        
-        for ipad in ipads_with_data:
-            student = ipad["student_data"][0] if ipad["student_data"] else None
-            assignment = ipad["current_assignment"][0] if ipad["current_assignment"] else None
+        async def export_rows():
+            async for ipad in cursor:
+                student = ipad["student_data"][0] if ipad["student_data"] else None
+                assignment = ipad["current_assignment"][0] if ipad["current_assignment"] else None
             
-            # Format assignment date
-            ausleibe_datum = ""
-            if assignment and assignment.get("assigned_at"):
-                try:
-                    assigned_date = datetime.fromisoformat(assignment["assigned_at"].replace('Z', '+00:00'))
-                    ausleibe_datum = assigned_date.strftime("%d.%m.%Y")
-                except:
-                    ausleibe_datum = ""
+                # Format assignment date
+                ausleibe_datum = format_german_date(assignment.get("assigned_at")) if assignment else ""
             
-            # Format Geburtstag to DD.MM.YYYY (same logic as assignment export)
-            geburtstag_formatted = ""
-            if student and student.get("sus_geb"):
-                try:
-                    geb_str = str(student["sus_geb"]).strip()
-                    
-                    # Skip if empty or 'nan'
-                    if not geb_str or geb_str.lower() == 'nan':
-                        geburtstag_formatted = ""
-                    # Already in DD.MM.YYYY format - ensure leading zeros
-                    elif "." in geb_str:
-                        parts = geb_str.split(".")
-                        if len(parts) == 3:
-                            try:
-                                day, month, year = parts
-                                date_obj = datetime(int(year), int(month), int(day))
-                                geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                            except:
-                                geburtstag_formatted = geb_str
-                    # ISO format: YYYY-MM-DD or YYYY-MM-DD HH:MM:SS
-                    elif "-" in geb_str:
-                        # Remove time part if present
-                        if " " in geb_str:
-                            geb_str = geb_str.split(" ")[0]
-                        date_obj = datetime.strptime(geb_str, "%Y-%m-%d")
-                        geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    # Compact format: YYYYMMDD
-                    elif len(geb_str) == 8 and geb_str.isdigit():
-                        date_obj = datetime.strptime(geb_str, "%Y%m%d")
-                        geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    # Try parsing as DD/MM/YYYY
-                    elif "/" in geb_str:
-                        parts = geb_str.split("/")
-                        if len(parts) == 3:
-                            day, month, year = parts
-                            date_obj = datetime(int(year), int(month), int(day))
-                            geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    else:
-                        geburtstag_formatted = geb_str
-                except Exception as e:
-                    geburtstag_formatted = student.get("sus_geb", "") if student else ""
+                # Birth dates are stored canonically (YYYY-MM-DD), only formatting is left
+                geburtstag_formatted = format_birth_date(student.get("sus_geb")) if student else ""
             
-            row = {
-                # Student data (empty if no assignment) - EXACT same order as assignment export
-                "Sname": student.get("sname", "") if student else "",
-                "SuSNachn": student.get("sus_nachn", "") if student else "",
-                "SuSVorn": student.get("sus_vorn", "") if student else "",
-                "SuSKl": student.get("sus_kl", "") if student else "",
-                "SuSStrHNr": student.get("sus_str_hnr", "") if student else "",
-                "SuSPLZ": student.get("sus_plz", "") if student else "",
-                "SuSOrt": student.get("sus_ort", "") if student else "",
-                "SuSGeb": geburtstag_formatted,  # Formatted to DD.MM.YYYY
-                "Erz1Nachn": student.get("erz1_nachn", "") if student else "",
-                "Erz1Vorn": student.get("erz1_vorn", "") if student else "",
-                "Erz1StrHNr": student.get("erz1_str_hnr", "") if student else "",
-                "Erz1PLZ": student.get("erz1_plz", "") if student else "",
-                "Erz1Ort": student.get("erz1_ort", "") if student else "",
-                "Erz2Nachn": student.get("erz2_nachn", "") if student else "",
-                "Erz2Vorn": student.get("erz2_vorn", "") if student else "",
-                "Erz2StrHNr": student.get("erz2_str_hnr", "") if student else "",
-                "Erz2PLZ": student.get("erz2_plz", "") if student else "",
-                "Erz2Ort": student.get("erz2_ort", "") if student else "",
+                row = {
+                    # Student data (empty if no assignment) - EXACT same order as assignment export
+                    "Sname": student.get("sname", "") if student else "",
+                    "SuSNachn": student.get("sus_nachn", "") if student else "",
+                    "SuSVorn": student.get("sus_vorn", "") if student else "",
+                    "SuSKl": student.get("sus_kl", "") if student else "",
+                    "SuSStrHNr": student.get("sus_str_hnr", "") if student else "",
+                    "SuSPLZ": student.get("sus_plz", "") if student else "",
+                    "SuSOrt": student.get("sus_ort", "") if student else "",
+                    "SuSGeb": geburtstag_formatted,  # Formatted to DD.MM.YYYY
+                    "Erz1Nachn": student.get("erz1_nachn", "") if student else "",
+                    "Erz1Vorn": student.get("erz1_vorn", "") if student else "",
+                    "Erz1StrHNr": student.get("erz1_str_hnr", "") if student else "",
+                    "Erz1PLZ": student.get("erz1_plz", "") if student else "",
+                    "Erz1Ort": student.get("erz1_ort", "") if student else "",
+                    "Erz2Nachn": student.get("erz2_nachn", "") if student else "",
+                    "Erz2Vorn": student.get("erz2_vorn", "") if student else "",
+                    "Erz2StrHNr": student.get("erz2_str_hnr", "") if student else "",
+                    "Erz2PLZ": student.get("erz2_plz", "") if student else "",
+                    "Erz2Ort": student.get("erz2_ort", "") if student else "",
                 
-                # iPad data in EXACT same order as assignment export
-                "Pencil": pencil,
-                "ITNr": ipad.get("itnr", ""),
-                "SNr": ipad.get("snr", ""),
-                "Typ": ipad_typ,
-                "AnschJahr": "",  # Can be added later if needed
-                "AusleiheDatum": ausleibe_datum,
-                "Rückgabe": ""  # Always empty as requested
-            }
-            export_data.append(row)
-        
-        # Create DataFrame and export to Excel
-        df = pd.DataFrame(export_data)
-        
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Bestandsliste', index=False)
-        
-        output.seek(0)
+                    # iPad data in EXACT same order as assignment export
+                    "Pencil": pencil,
+                    "ITNr": ipad.get("itnr", ""),
+                    "SNr": ipad.get("snr", ""),
+                    "Typ": ipad_typ,
+                    "AnschJahr": "",  # Can be added later if needed
+                    "AusleiheDatum": ausleibe_datum,
+                    "Rückgabe": ""  # Always empty as requested
+                }
+                yield row
         
         # Return as downloadable file
-        filename = f"bestandsliste_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        filename_base = f"bestandsliste_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
-        return StreamingResponse(
-            io.BytesIO(output.read()),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        return await cached_export(
+            request, current_user, "inventory", {}, export_format, filename_base,
+            lambda: export_response(export_rows(), export_format, 'Bestandsliste', filename_base)
         )
         
     except Exception as e:
@@ -2713,6 +4769,10 @@ async def cleanup_old_data(current_user: dict = Depends(get_current_user)):
     try:
         five_years_ago = datetime.now(timezone.utc) - timedelta(days=5*365)
         
+        # ISO strings do not match a date range, old records would silently survive
+        if await pending_timestamp_migration({"students": ["created_at"], "contracts": ["uploaded_at"]}):
+            raise HTTPException(status_code=409, detail="Timestamps are not migrated yet, run /api/timestamps/migrate first")
+        
         # Add timestamps to existing records if missing
         await add_missing_timestamps()
         
@@ -2722,15 +4782,17 @@ async def cleanup_old_data(current_user: dict = Depends(get_current_user)):
         active_student_ids = [a["student_id"] for a in active_assignments]
         
         old_students_result = await db.students.delete_many({
-            "created_at": {"$lt": five_years_ago.isoformat()},
+            "created_at": {"$lt": five_years_ago},
             "id": {"$nin": active_student_ids}
         })
         
         # Delete old contracts
-        old_contracts_result = await db.contracts.delete_many({
-            "uploaded_at": {"$lt": five_years_ago.isoformat()}
+        old_contracts_result = await delete_contracts({
+            "uploaded_at": {"$lt": five_years_ago}
         })
         
+        await bump_data_version(None)
+        
         return {
             "message": "Data protection cleanup completed",
             "deleted_students": old_students_result.deleted_count,
@@ -2738,6 +4800,8 @@ async def cleanup_old_data(current_user: dict = Depends(get_current_user)):
             "cutoff_date": five_years_ago.isoformat()
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during cleanup: {str(e)}")
 
@@ -2747,25 +4811,25 @@ async def add_missing_timestamps():
         # Update students without created_at
         await db.students.update_many(
             {"created_at": {"$exists": False}},
-            {"$set": {"created_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"created_at": datetime.now(timezone.utc)}}
         )
         
         # Update contracts without uploaded_at
         await db.contracts.update_many(
             {"uploaded_at": {"$exists": False}},
-            {"$set": {"uploaded_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"uploaded_at": datetime.now(timezone.utc)}}
         )
         
         # Update iPads without created_at
         await db.ipads.update_many(
             {"created_at": {"$exists": False}},
-            {"$set": {"created_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"created_at": datetime.now(timezone.utc)}}
         )
         
         # Update assignments without assigned_at
         await db.assignments.update_many(
             {"assigned_at": {"$exists": False}},
-            {"$set": {"assigned_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"assigned_at": datetime.now(timezone.utc)}}
         )
         
     except Exception as e:
@@ -2774,159 +4838,112 @@ async def add_missing_timestamps():
 # Export functionality
 @api_router.get("/assignments/export")
 async def export_assignments(
+    request: Request,
     sus_vorn: Optional[str] = None,
     sus_nachn: Optional[str] = None, 
     sus_kl: Optional[str] = None,
     itnr: Optional[str] = None,
+    export_format: str = Query("xlsx", alias="format"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Export assignments to Excel (all or filtered)"""
+    """Export assignments to Excel, CSV or NDJSON (all or filtered)"""
+    export_format = validate_export_format(export_format)
+    
     # Apply user filter - CRITICAL for RBAC!
     user_filter = await get_user_filter(current_user)
     
     # Build filter query for students (with user filter!)
-    student_filter = user_filter.copy()
-    if sus_vorn:
-        student_filter["sus_vorn"] = {"$regex": sus_vorn, "$options": "i"}
-    if sus_nachn:
-        student_filter["sus_nachn"] = {"$regex": sus_nachn, "$options": "i"}
-    if sus_kl:
-        student_filter["sus_kl"] = {"$regex": sus_kl, "$options": "i"}
+    student_search = compile_search_filter({"sus_vorn": sus_vorn, "sus_nachn": sus_nachn, "sus_kl": sus_kl})
+    student_filter = {**user_filter, **student_search}
     
     # Build filter query for assignments (IT-Nummer) with user filter!
     assignment_filter = user_filter.copy()
     assignment_filter["is_active"] = True
-    if itnr:
-        assignment_filter["itnr"] = {"$regex": itnr, "$options": "i"}
-    
-    if sus_vorn or sus_nachn or sus_kl:
-        # Get matching students (filtered by user_id!)
-        students = await db.students.find(student_filter).to_list(length=None)
-        student_ids = [s["id"] for s in students]
-        
-        # Add student filter to assignment filter
-        assignment_filter["student_id"] = {"$in": student_ids}
+    assignment_filter.update(compile_search_filter({"itnr": itnr}))
     
-    # Get assignments matching all filters (filtered by user_id!)
-    assignments = await db.assignments.find(assignment_filter).to_list(length=None)
-    
-    export_data = []
-    for assignment in assignments:
-        # Get student data
-        student = await db.students.find_one({"id": assignment["student_id"]})
-        # Get iPad data
-        ipad = await db.ipads.find_one({"id": assignment["ipad_id"]})
-        
-        if student and ipad:
-            # Format Geburtstag to DD.MM.YYYY (with leading zeros!)
-            geburtstag_formatted = ""
-            if student.get("sus_geb"):
-                try:
-                    geb_str = str(student["sus_geb"]).strip()
-                    
-                    # Skip if empty or 'nan'
-                    if not geb_str or geb_str.lower() == 'nan':
-                        geburtstag_formatted = ""
-                    # Already in DD.MM.YYYY format - ensure leading zeros
-                    elif "." in geb_str:
-                        parts = geb_str.split(".")
-                        if len(parts) == 3:
-                            try:
-                                day, month, year = parts
-                                # Parse and reformat with leading zeros
-                                date_obj = datetime(int(year), int(month), int(day))
-                                geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                            except:
-                                geburtstag_formatted = geb_str
-                    # ISO format: YYYY-MM-DD or YYYY-MM-DD HH:MM:SS
-                    elif "-" in geb_str:
-                        # Remove time part if present
-                        if " " in geb_str:
-                            geb_str = geb_str.split(" ")[0]
-                        date_obj = datetime.strptime(geb_str, "%Y-%m-%d")
-                        geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    # Compact format: YYYYMMDD
-                    elif len(geb_str) == 8 and geb_str.isdigit():
-                        date_obj = datetime.strptime(geb_str, "%Y%m%d")
-                        geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    # Try parsing as DD/MM/YYYY
-                    elif "/" in geb_str:
-                        parts = geb_str.split("/")
-                        if len(parts) == 3:
-                            day, month, year = parts
-                            date_obj = datetime(int(year), int(month), int(day))
-                            geburtstag_formatted = date_obj.strftime("%d.%m.%Y")
-                    else:
-                        # Unknown format, keep as is
-                        geburtstag_formatted = geb_str
-                except Exception as e:
-                    # If all parsing fails, keep original or empty
-                    geburtstag_formatted = student.get("sus_geb", "")
+    async def export_rows(cursor):
+        async for assignment in cursor:
+            student = assignment.get("student")
+            ipad = assignment.get("ipad")
             
-            # Format AusleiheDatum from assignment assigned_at
-            ausleihe_datum_formatted = ""
-            if assignment.get("assigned_at"):
-                try:
-                    # Parse ISO format datetime and convert to DD.MM.YYYY
-                    assigned_date = datetime.fromisoformat(assignment["assigned_at"].replace('Z', '+00:00'))
-                    ausleihe_datum_formatted = assigned_date.strftime("%d.%m.%Y")
-                except:
-                    ausleihe_datum_formatted = ""
+            if student and ipad:
+                # Birth dates are stored canonically (YYYY-MM-DD), only formatting is left
+                geburtstag_formatted = format_birth_date(student.get("sus_geb"))
             
-            # Combine data in EXACT same order as Bestandsliste export
-            row_data = {
-                # Student data first (matching Bestandsliste order exactly)
-                "Sname": student.get("sname", ""),
-                "SuSNachn": student.get("sus_nachn", ""),
-                "SuSVorn": student.get("sus_vorn", ""),
-                "SuSKl": student.get("sus_kl", ""),
-                "SuSStrHNr": student.get("sus_str_hnr", ""),
-                "SuSPLZ": student.get("sus_plz", ""),
-                "SuSOrt": student.get("sus_ort", ""),
-                "SuSGeb": geburtstag_formatted,  # Formatted to TT.MM.JJJJ
-                "Erz1Nachn": student.get("erz1_nachn", ""),
-                "Erz1Vorn": student.get("erz1_vorn", ""),
-                "Erz1StrHNr": student.get("erz1_str_hnr", ""),
-                "Erz1PLZ": student.get("erz1_plz", ""),
-                "Erz1Ort": student.get("erz1_ort", ""),
-                "Erz2Nachn": student.get("erz2_nachn", ""),
-                "Erz2Vorn": student.get("erz2_vorn", ""),
-                "Erz2StrHNr": student.get("erz2_str_hnr", ""),
-                "Erz2PLZ": student.get("erz2_plz", ""),
-                "Erz2Ort": student.get("erz2_ort", ""),
-                # iPad data in EXACT same order as Bestandsliste export
-                "Pencil": ipad.get("pencil", ""),
-                "ITNr": ipad.get("itnr", ""),
-                "SNr": ipad.get("snr", ""),
-                "Typ": ipad.get("typ", ""),
-                "AnschJahr": ipad.get("ansch_jahr", ""),
-                "AusleiheDatum": ausleihe_datum_formatted,  # From assigned_at, formatted to TT.MM.JJJJ
-                "Rückgabe": ""  # Empty as in Bestandsliste export
-                # REMOVED: "Zugewiesen_am" and "Vertrag_vorhanden" as requested
-            }
-            export_data.append(row_data)
-    
-    # Create Excel file
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df = pd.DataFrame(export_data)
-        df.to_excel(writer, sheet_name='Zuordnungen', index=False)
+                # Format AusleiheDatum from assignment assigned_at
+                ausleihe_datum_formatted = format_german_date(assignment.get("assigned_at"))
+            
+                # Combine data in EXACT same order as Bestandsliste export
+                row_data = {
+                    # Student data first (matching Bestandsliste order exactly)
+                    "Sname": student.get("sname", ""),
+                    "SuSNachn": student.get("sus_nachn", ""),
+                    "SuSVorn": student.get("sus_vorn", ""),
+                    "SuSKl": student.get("sus_kl", ""),
+                    "SuSStrHNr": student.get("sus_str_hnr", ""),
+                    "SuSPLZ": student.get("sus_plz", ""),
+                    "SuSOrt": student.get("sus_ort", ""),
+                    "SuSGeb": geburtstag_formatted,  # Formatted to TT.MM.JJJJ
+                    "Erz1Nachn": student.get("erz1_nachn", ""),
+                    "Erz1Vorn": student.get("erz1_vorn", ""),
+                    "Erz1StrHNr": student.get("erz1_str_hnr", ""),
+                    "Erz1PLZ": student.get("erz1_plz", ""),
+                    "Erz1Ort": student.get("erz1_ort", ""),
+                    "Erz2Nachn": student.get("erz2_nachn", ""),
+                    "Erz2Vorn": student.get("erz2_vorn", ""),
+                    "Erz2StrHNr": student.get("erz2_str_hnr", ""),
+                    "Erz2PLZ": student.get("erz2_plz", ""),
+                    "Erz2Ort": student.get("erz2_ort", ""),
+                    # iPad data in EXACT same order as Bestandsliste export
+                    "Pencil": ipad.get("pencil", ""),
+                    "ITNr": ipad.get("itnr", ""),
+                    "SNr": ipad.get("snr", ""),
+                    "Typ": ipad.get("typ", ""),
+                    "AnschJahr": ipad.get("ansch_jahr", ""),
+                    "AusleiheDatum": ausleihe_datum_formatted,  # From assigned_at, formatted to TT.MM.JJJJ
+                    "Rückgabe": ""  # Empty as in Bestandsliste export
+                    # REMOVED: "Zugewiesen_am" and "Vertrag_vorhanden" as requested
+                }
+                yield row_data
     
-    output.seek(0)
+    async def build():
+        # Only queried on a cache miss, a 304 or cache hit needs no student lookup
+        if student_search:
+            # Get matching students (filtered by user_id!)
+            students = await db.students.find(student_filter, {"_id": 0, "id": 1}).to_list(length=None)
+            student_ids = [s["id"] for s in students]
+            
+            # Add student filter to assignment filter
+            assignment_filter["student_id"] = {"$in": student_ids}
+        
+        # Get assignments matching all filters (filtered by user_id!) joined with
+        # their student and iPad in one aggregation (no per-row lookups)
+        pipeline = [
+            {"$match": assignment_filter},
+            {"$lookup": {"from": "students", "localField": "student_id", "foreignField": "id", "as": "student"}},
+            {"$lookup": {"from": "ipads", "localField": "ipad_id", "foreignField": "id", "as": "ipad"}},
+            {"$unwind": "$student"},
+            {"$unwind": "$ipad"},
+            {"$project": {"_id": 0, "student._id": 0, "ipad._id": 0}}
+        ]
+        cursor = db.assignments.aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE)
+        return await export_response(export_rows(cursor), export_format, 'Zuordnungen', "zuordnungen_export")
     
-    return StreamingResponse(
-        io.BytesIO(output.read()),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={"Content-Disposition": "attachment; filename=zuordnungen_export.xlsx"}
+    filters = {"sus_vorn": sus_vorn, "sus_nachn": sus_nachn, "sus_kl": sus_kl, "itnr": itnr}
+    return await cached_export(
+        request, current_user, "assignments", filters, export_format, "zuordnungen_export", build
     )
 
 # Filtering
 @api_router.get("/assignments/filtered")
 async def get_filtered_assignments(
+    response: Response,
     sus_vorn: Optional[str] = None,
     sus_nachn: Optional[str] = None, 
     sus_kl: Optional[str] = None,
     itnr: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGINATION_MAX_LIMIT),
+    after: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     try:
@@ -2934,23 +4951,17 @@ async def get_filtered_assignments(
         user_filter = await get_user_filter(current_user)
         
         # Build filter query for students (with user filter!)
-        student_filter = user_filter.copy()
-        if sus_vorn:
-            student_filter["sus_vorn"] = {"$regex": sus_vorn, "$options": "i"}
-        if sus_nachn:
-            student_filter["sus_nachn"] = {"$regex": sus_nachn, "$options": "i"}
-        if sus_kl:
-            student_filter["sus_kl"] = {"$regex": sus_kl, "$options": "i"}
+        student_search = compile_search_filter({"sus_vorn": sus_vorn, "sus_nachn": sus_nachn, "sus_kl": sus_kl})
+        student_filter = {**user_filter, **student_search}
         
         # Build filter query for assignments (IT-Nummer) with user filter!
         assignment_filter = user_filter.copy()
         assignment_filter["is_active"] = True
-        if itnr:
-            assignment_filter["itnr"] = {"$regex": itnr, "$options": "i"}
+        assignment_filter.update(compile_search_filter({"itnr": itnr}))
         
-        if sus_vorn or sus_nachn or sus_kl:
+        if student_search:
             # Get matching students (filtered by user_id!)
-            students = await db.students.find(student_filter).to_list(length=None)
+            students = await db.students.find(student_filter, {"_id": 0, "id": 1}).to_list(length=None)
             student_ids = [s["id"] for s in students]
             
             if not student_ids:
@@ -2961,28 +4972,202 @@ async def get_filtered_assignments(
             assignment_filter["student_id"] = {"$in": student_ids}
         
         # Get assignments matching all filters (filtered by user_id!)
-        assignments = await db.assignments.find(assignment_filter).to_list(length=None)
+        # The itnr_key index has the simple collation, only usable without one
+        assignments = await find_page(
+            db.assignments, assignment_filter, PAGINATION_SORT_KEYS["assignments"], limit, after, response,
+            collation=None if itnr else GERMAN_COLLATION
+        )
         
         # Safe parsing
         result = []
         for assignment in assignments:
             try:
-                result.append(Assignment(**parse_from_mongo(assignment)))
+                result.append(Assignment(**assignment))
             except Exception as e:
                 print(f"Error parsing assignment {assignment.get('id')}: {e}")
                 continue
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Filter error: {e}")
         raise HTTPException(status_code=500, detail=f"Filter error: {str(e)}")
 
+# Index manager
+# The indexes each query shape needs are declared here, next to the code that
+# runs the queries, and ensured at startup (also on databases that
+# mongo-init/init.js never touched). Differences to the live database are
+# reported as drift; only indexes listed in OBSOLETE_INDEXES are dropped
+# automatically because they contradict the code.
+ENSURE_INDEXES_ON_STARTUP = os.environ.get("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+def index_spec(keys: List[Tuple[str, int]], **options) -> dict:
+    return {"keys": keys, "options": options}
+
+UNASSIGNED = {"current_assignment_id": None}
+
+INDEX_SPECS = {
+    "users": [
+        index_spec([("id", 1)], unique=True),
+        index_spec([("username", 1)], unique=True),
+    ],
+    "ipads": [
+        index_spec([("id", 1)], unique=True),
+        # ITNr is unique per owner (users can have the same ITNr)
+        index_spec([("user_id", 1), ("itnr", 1)], unique=True),
+        index_spec([("user_id", 1), ("current_assignment_id", 1)], partialFilterExpression=UNASSIGNED),
+        # Pagination (German collation)
+        index_spec([("user_id", 1), ("itnr", 1), ("id", 1)], collation=GERMAN_COLLATION),
+        index_spec([("itnr", 1), ("id", 1)], collation=GERMAN_COLLATION),
+    ],
+    "students": [
+        index_spec([("id", 1)], unique=True),
+        index_spec([("user_id", 1), ("current_assignment_id", 1)], partialFilterExpression=UNASSIGNED),
+        index_spec([("user_id", 1), ("sus_kl", 1), ("sus_nachn", 1), ("sus_vorn", 1), ("id", 1)], collation=GERMAN_COLLATION),
+        index_spec([("sus_kl", 1), ("sus_nachn", 1), ("sus_vorn", 1), ("id", 1)], collation=GERMAN_COLLATION),
+        # Search keys (prefix matches)
+        index_spec([("user_id", 1), ("sus_nachn_key", 1)]),
+        index_spec([("user_id", 1), ("sus_vorn_key", 1)]),
+        index_spec([("user_id", 1), ("sus_kl_key", 1)]),
+        # Retention cleanup (created_at range, BSON dates)
+        index_spec([("created_at", 1)]),
+    ],
+    "assignments": [
+        index_spec([("id", 1)], unique=True),
+        index_spec([("user_id", 1), ("is_active", 1)]),
+        index_spec([("user_id", 1), ("itnr", 1), ("is_active", 1)]),
+        index_spec([("user_id", 1), ("is_active", 1), ("itnr_key", 1)]),
+        index_spec([("user_id", 1), ("is_active", 1), ("itnr", 1), ("id", 1)], collation=GERMAN_COLLATION),
+        index_spec([("is_active", 1), ("itnr", 1), ("id", 1)], collation=GERMAN_COLLATION),
+        index_spec([("student_id", 1)]),
+        index_spec([("ipad_id", 1)]),
+        index_spec([("contract_id", 1)]),
+    ],
+    "contracts": [
+        index_spec([("id", 1)], unique=True),
+        index_spec([("user_id", 1), ("is_active", 1)]),
+        index_spec([("assignment_id", 1)]),
+        index_spec([("itnr", 1)]),
+        index_spec([("file_id", 1)]),
+        index_spec([("uploaded_at", 1)]),
+    ],
+    "jobs": [
+        index_spec([("id", 1)], unique=True),
+        index_spec([("status", 1)]),
+        # Retention: finished jobs expire, active ones have finished_at None
+        index_spec([("finished_at", 1)], expireAfterSeconds=JOB_RETENTION_DAYS * 86400),
+    ],
+}
+
+OBSOLETE_INDEXES = {
+    # Global unique ITNr from the old init script: blocks the same ITNr for different users
+    "ipads": [index_spec([("itnr", 1)], unique=True)],
+}
+
+def index_signature(keys, options: dict) -> tuple:
+    """Comparable identity of an index: key pattern, uniqueness, partial filter and collation locale"""
+    collation = options.get("collation") or {}
+    return (
+        tuple((field, int(direction)) for field, direction in keys),
+        bool(options.get("unique", False)),
+        json.dumps(options.get("partialFilterExpression"), sort_keys=True, default=str),
+        collation.get("locale", "simple"),
+        options.get("expireAfterSeconds"),
+    )
+
+def describe_index(keys, options: dict) -> str:
+    description = ", ".join(f"{field}:{int(direction)}" for field, direction in keys)
+    extras = [name for name in ("unique", "partialFilterExpression", "collation", "expireAfterSeconds") if options.get(name)]
+    return f"({description})" + (f" [{', '.join(extras)}]" if extras else "")
+
+async def sync_indexes(apply: bool = True, drop_undeclared: bool = False) -> dict:
+    """
+    Compare declared and existing indexes. With apply=True missing indexes are
+    created (idempotent) and obsolete ones dropped; undeclared indexes are only
+    dropped with drop_undeclared=True. Returns the drift report.
+    """
+    report = {"created": [], "missing": [], "dropped": [], "obsolete": [],
+              "undeclared": [], "conflicts": [], "errors": []}
+    
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = {}
+        async for info in collection.list_indexes():
+            if info["name"] != "_id_":
+                existing[info["name"]] = (list(info["key"].items()), info)
+        
+        def label(keys, options):
+            return f"{collection_name} {describe_index(keys, options)}"
+        
+        # Indexes that contradict the code
+        for spec in OBSOLETE_INDEXES.get(collection_name, []):
+            obsolete = index_signature(spec["keys"], spec["options"])
+            for name, (keys, info) in list(existing.items()):
+                if index_signature(keys, info) != obsolete:
+                    continue
+                if apply:
+                    await collection.drop_index(name)
+                    report["dropped"].append(f"{collection_name}.{name}")
+                    del existing[name]
+                else:
+                    report["obsolete"].append(f"{collection_name}.{name}")
+        
+        existing_signatures = {index_signature(keys, info): name for name, (keys, info) in existing.items()}
+        declared_signatures = set()
+        
+        for spec in specs:
+            keys, options = spec["keys"], spec["options"]
+            signature = index_signature(keys, options)
+            declared_signatures.add(signature)
+            if signature in existing_signatures:
+                continue
+            # Same keys and collation but other options (e.g. not unique): cannot coexist
+            clash = next((name for existing_signature, name in existing_signatures.items()
+                          if existing_signature[0] == signature[0] and existing_signature[3] == signature[3]), None)
+            if clash:
+                report["conflicts"].append(f"{label(keys, options)} differs from existing {collection_name}.{clash}")
+                continue
+            if not apply:
+                report["missing"].append(label(keys, options))
+                continue
+            try:
+                await collection.create_index(keys, **options)
+                report["created"].append(label(keys, options))
+            except OperationFailure as e:
+                report["errors"].append(f"{label(keys, options)}: {e}")
+        
+        for signature, name in existing_signatures.items():
+            if signature in declared_signatures:
+                continue
+            if apply and drop_undeclared:
+                await collection.drop_index(name)
+                report["dropped"].append(f"{collection_name}.{name}")
+            else:
+                report["undeclared"].append(f"{collection_name}.{name}")
+    
+    report["drift"] = any(report[key] for key in ("missing", "obsolete", "undeclared", "conflicts", "errors"))
+    return report
+
+@api_router.get("/admin/indexes")
+async def get_index_drift(current_user: dict = Depends(get_current_user)):
+    """Drift between declared and existing indexes (read only)"""
+    require_admin(current_user)
+    return await sync_indexes(apply=False)
+
+@api_router.post("/admin/indexes/sync")
+async def sync_index_definitions(drop_undeclared: bool = False, current_user: dict = Depends(get_current_user)):
+    """Create missing indexes, drop obsolete ones (and undeclared ones on request)"""
+    require_admin(current_user)
+    return await sync_indexes(apply=True, drop_undeclared=drop_undeclared)
+
 # Include the router
 app.include_router(api_router)
 
 # Add security middleware
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(DBInstrumentationMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -2990,8 +5175,12 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', 'http://localhost:3000,https://ipad-manager-1.preview.emergentagent.com').split(','),
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-DB-Queries", "X-DB-Time-ms", "X-Request-ID", "Server-Timing"],
 )
 
+# Outermost, so latency and status include CORS and security headers
+app.add_middleware(PrometheusMetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -2999,6 +5188,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def ensure_indexes():
+    if not ENSURE_INDEXES_ON_STARTUP:
+        return
+    try:
+        report = await sync_indexes(apply=True)
+        for key in ("created", "dropped"):
+            if report[key]:
+                print(f"Indexes {key}: {', '.join(report[key])}")
+        for key in ("undeclared", "conflicts", "errors"):
+            if report[key]:
+                print(f"Warning: index drift ({key}): {'; '.join(report[key])}")
+    except Exception as e:
+        print(f"Warning: Could not ensure indexes: {e}")
+
+@app.on_event("startup")
+async def ensure_search_keys():
+    # Filters only match on the *_key fields, documents from before they existed need them
+    try:
+        updated = await backfill_search_keys(missing_only=True)
+        if any(updated.values()):
+            print(f"Search keys backfilled: {updated}")
+    except Exception as e:
+        print(f"Warning: Could not backfill search keys: {e}")
+
+@app.on_event("startup")
+async def ensure_contract_warnings():
+    # /assignments only reads the stored warning, older assignments were never evaluated
+    try:
+        counts = await backfill_contract_warnings(missing_only=True)
+        if counts["updated_count"]:
+            print(f"Contract warnings backfilled: {counts['updated_count']}")
+    except Exception as e:
+        print(f"Warning: Could not backfill contract warnings: {e}")
+
+@app.on_event("startup")
+async def resume_background_jobs():
+    # Resumes jobs of stopped workers now and whenever a heartbeat goes stale
+    job_runner.start_maintenance()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    job_runner.stop_maintenance()
+    client.close()
+    hashing_executor.shutdown(wait=False)
+    if _pdf_parse_executor is not None:
+        _pdf_parse_executor.shutdown(wait=False)
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Helpers for tests that check backend/server.py without importing it: the
+backend dependencies (FastAPI, Motor, ...) and MongoDB are not needed.
+"""
+
+import ast
+from pathlib import Path
+
+SERVER_PATH = Path(__file__).resolve().parent.parent / "backend" / "server.py"
+
+
+def server_tree() -> ast.Module:
+    return ast.parse(SERVER_PATH.read_text(encoding="utf-8"))
+
+
+def load_definitions(names, namespace=None) -> dict:
+    """
+    Execute the top-level functions, classes and assignments called `names`
+    of server.py in isolation. `namespace` provides whatever they reference
+    (imports, other globals).
+    """
+    names = set(names)
+    wanted = []
+    for node in server_tree().body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and node.name in names:
+            wanted.append(node)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id in names for target in node.targets
+        ):
+            wanted.append(node)
+    namespace = dict(namespace or {})
+    exec(compile(ast.Module(body=wanted, type_ignores=[]), str(SERVER_PATH), "exec"), namespace)
+    missing = names - namespace.keys()
+    assert not missing, f"not defined at module level in server.py: {', '.join(sorted(missing))}"
+    return namespace
@@ -0,0 +1,94 @@
+"""
+Contract documents may still carry the legacy file_data blob (up to 5 MB).
+Only the download endpoint and the GridFS migration are allowed to read it,
+every other read has to go through the contract metadata query layer.
+
+The checks work on the source of backend/server.py, so they run without
+MongoDB or the backend dependencies installed.
+"""
+
+import ast
+from typing import List, Optional
+
+from .server_source import load_definitions, server_tree
+
+READ_METHODS = {
+    "find", "find_one", "find_one_and_update", "find_one_and_replace",
+    "find_one_and_delete", "aggregate", "watch",
+}
+# Functions that may read contract documents directly
+METADATA_LAYER = {"find_contract_metadata", "get_contract_metadata"}
+BLOB_READERS = {"download_contract", "migrate_contract_files"}
+# $match/$group only, never returns documents
+AGGREGATE_ONLY = {"delete_contracts"}
+
+
+def _functions(tree):
+    return [node for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+
+
+def _contract_reads(function):
+    """(method, lineno) of every db.contracts.<read> call inside a function"""
+    for node in ast.walk(function):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        collection = node.func.value
+        if (
+            node.func.attr in READ_METHODS
+            and isinstance(collection, ast.Attribute)
+            and collection.attr == "contracts"
+            and isinstance(collection.value, ast.Name)
+            and collection.value.id == "db"
+        ):
+            yield node.func.attr, node.lineno
+
+
+def _load_projection_helpers():
+    """CONTRACT_METADATA_PROJECTION and contract_projection() from server.py"""
+    return load_definitions(["CONTRACT_METADATA_PROJECTION", "contract_projection"],
+                            {"Optional": Optional, "List": List})
+
+
+def test_contract_reads_go_through_metadata_layer():
+    violations = []
+    for function in _functions(server_tree()):
+        if function.name in METADATA_LAYER | BLOB_READERS:
+            continue
+        for method, lineno in _contract_reads(function):
+            if function.name in AGGREGATE_ONLY and method == "aggregate":
+                continue
+            violations.append(f"{function.name}() line {lineno}: db.contracts.{method}")
+    assert not violations, "Contract reads outside the metadata layer:\n" + "\n".join(violations)
+
+
+def test_contract_lookups_project_fields():
+    """$lookup from contracts must use a pipeline with $project (a plain lookup copies file_data)"""
+    violations = []
+    for node in ast.walk(server_tree()):
+        if not isinstance(node, ast.Dict):
+            continue
+        entries = {key.value: value for key, value in zip(node.keys, node.values) if isinstance(key, ast.Constant)}
+        source = entries.get("from")
+        if not (isinstance(source, ast.Constant) and source.value == "contracts"):
+            continue
+        pipeline = entries.get("pipeline")
+        stages = ast.dump(pipeline) if pipeline is not None else ""
+        if "'$project'" not in stages or "'file_data'" in stages:
+            violations.append(f"line {node.lineno}")
+    assert not violations, "$lookup from contracts without a safe projection: " + ", ".join(violations)
+
+
+def test_metadata_projection_excludes_blob():
+    helpers = _load_projection_helpers()
+    assert helpers["CONTRACT_METADATA_PROJECTION"].get("file_data") == 0
+    assert helpers["contract_projection"]() == helpers["CONTRACT_METADATA_PROJECTION"]
+    assert helpers["contract_projection"](["id", "filename"]) == {"_id": 0, "id": 1, "filename": 1}
+
+
+def test_metadata_projection_rejects_blob_field():
+    helpers = _load_projection_helpers()
+    try:
+        helpers["contract_projection"](["id", "file_data"])
+    except ValueError:
+        return
+    raise AssertionError("contract_projection() must not allow selecting file_data")
@@ -0,0 +1,122 @@
+"""
+Round-trip counts of list, export and batch endpoints, measured with the DB command
+listener of backend/server.py. Guards against N+1 query patterns: the number
+of MongoDB commands of an export must not grow with the number of rows.
+
+Needs a disposable MongoDB (TEST_MONGO_URL) and the backend dependencies;
+the module is skipped otherwise. All data is written under a fresh user and
+removed afterwards.
+"""
+
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+pytestmark = pytest.mark.skipif(not TEST_MONGO_URL, reason="TEST_MONGO_URL (disposable MongoDB) not set")
+
+EXPORT_ROUTE = "GET /api/assignments/export"
+
+
+@pytest.fixture(scope="module")
+def server():
+    os.environ["MONGO_URL"] = TEST_MONGO_URL
+    sys.path.insert(0, str(BACKEND_DIR))
+    pytest.importorskip("httpx")
+    return pytest.importorskip("server")
+
+
+@pytest.fixture(scope="module")
+def database():
+    pymongo = pytest.importorskip("pymongo")
+    mongo = pymongo.MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        mongo.admin.command("ping")
+    except Exception as e:
+        pytest.skip(f"MongoDB not reachable: {e}")
+    yield mongo["iPadDatabase"]
+    mongo.close()
+
+
+@pytest.fixture(scope="module")
+def tenant(server, database):
+    user_id = str(uuid.uuid4())
+    username = f"querycount-{user_id[:8]}"
+    database.users.insert_one({"id": user_id, "username": username, "role": "user", "is_active": True})
+    token = server.create_access_token({"sub": username}, user_id)
+    yield {"user_id": user_id, "headers": {"Authorization": f"Bearer {token}"}}
+    for name in ("assignments", "students", "ipads", "users"):
+        database[name].delete_many({"$or": [{"user_id": user_id}, {"id": user_id}]})
+    database.data_versions.delete_many({"_id": user_id})
+
+
+@pytest.fixture(scope="module")
+def client(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def seed_assignments(server, database, user_id, count):
+    students, ipads, assignments = [], [], []
+    for _ in range(count):
+        suffix = uuid.uuid4().hex[:8]
+        student = server.Student(user_id=user_id, sus_vorn=f"Vorname{suffix}", sus_nachn=f"Nachname{suffix}",
+                                 sus_kl="5a", sus_geb="2012-03-04")
+        ipad = server.iPad(user_id=user_id, itnr=f"IT{suffix}", snr=f"SN{suffix}", status="ok")
+        assignment = server.Assignment(user_id=user_id, ipad_id=ipad.id, student_id=student.id, itnr=ipad.itnr,
+                                       student_name=f"{student.sus_vorn} {student.sus_nachn}")
+        students.append(server.prepare_for_mongo(student.dict()))
+        ipads.append(server.prepare_for_mongo(ipad.dict()))
+        assignments.append(server.prepare_for_mongo(assignment.dict()))
+    database.students.insert_many(students)
+    database.ipads.insert_many(ipads)
+    database.assignments.insert_many(assignments)
+
+
+def export_queries(server, client, tenant, export_format):
+    server.db_route_metrics.reset()
+    response = client.get("/api/assignments/export", params={"format": export_format}, headers=tenant["headers"])
+    assert response.status_code == 200, response.text
+    return server.db_route_metrics.get(EXPORT_ROUTE)["queries_max"]
+
+
+def test_list_endpoint_reports_db_headers(client, tenant):
+    response = client.get("/api/assignments", headers=tenant["headers"])
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Queries"]) >= 1
+    assert float(response.headers["X-DB-Time-ms"]) >= 0
+
+
+def test_export_query_count_does_not_grow_with_rows(server, database, client, tenant):
+    seed_assignments(server, database, tenant["user_id"], 5)
+    # Different formats: each request misses the export cache
+    small = export_queries(server, client, tenant, "ndjson")
+
+    seed_assignments(server, database, tenant["user_id"], 45)
+    large = export_queries(server, client, tenant, "csv")
+
+    assert large == small, f"export issued {small} commands for 5 rows but {large} for 50 rows"
+    assert large <= 5, f"export issued {large} commands"
+
+
+def test_batch_dissolve_is_set_based(server, database, client, tenant):
+    seed_assignments(server, database, tenant["user_id"], 30)
+    server.db_route_metrics.reset()
+    response = client.post("/api/assignments/batch-dissolve", json={"all": True}, headers=tenant["headers"])
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert result["dissolved_count"] == result["total_found"] >= 30
+    assert len(result["details"]) == result["dissolved_count"]
+    assert database.assignments.count_documents({"user_id": tenant["user_id"], "is_active": True}) == 0
+    assert database.ipads.count_documents({"user_id": tenant["user_id"], "current_assignment_id": {"$ne": None}}) == 0
+    # find + four update_many + data version (transaction commit and hello on top)
+    queries = server.db_route_metrics.get("POST /api/assignments/batch-dissolve")["queries_max"]
+    assert queries <= 9, f"batch dissolve issued {queries} commands"
@@ -0,0 +1,60 @@
+"""
+Text exposition of the in-process HTTP metrics (GET /api/metrics).
+
+HTTPMetrics and its label helpers are executed in isolation from the source of
+backend/server.py, so the checks run without the backend dependencies.
+"""
+
+import threading
+from typing import Dict, List, Tuple
+
+from .server_source import load_definitions
+
+WANTED = {"HTTP_LATENCY_BUCKETS", "HTTPMetrics", "metric_label_value", "metric_labels"}
+
+
+class _NoDBMetrics:
+    def snapshot(self):
+        return [{"route": "GET /api/ipads", "queries_total": 3, "db_time_ms_total": 4.5}]
+
+
+def _load_metrics():
+    return load_definitions(WANTED, {"Dict": Dict, "List": List, "Tuple": Tuple, "threading": threading,
+                                     "db_route_metrics": _NoDBMetrics()})
+
+
+def _samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_counters_histogram_and_gauge():
+    helpers = _load_metrics()
+    metrics = helpers["HTTPMetrics"](buckets=(0.1, 1.0))
+    metrics.started("POST", "/api/ipads/upload")
+    metrics.started("POST", "/api/ipads/upload")
+    metrics.finished("POST", "/api/ipads/upload", 200, 0.05, 1024)
+    metrics.finished("POST", "/api/ipads/upload", 400, 2.0, 0)
+    metrics.started("GET", "/api/ipads")
+
+    samples = _samples(metrics.render())
+    upload = 'method="POST",route="/api/ipads/upload"'
+    assert samples[f'http_requests_total{{{upload},status="200"}}'] == 1
+    assert samples[f'http_requests_total{{{upload},status="400"}}'] == 1
+    assert samples[f'http_request_duration_seconds_bucket{{{upload},le="0.1"}}'] == 1
+    assert samples[f'http_request_duration_seconds_bucket{{{upload},le="1.0"}}'] == 1
+    assert samples[f'http_request_duration_seconds_bucket{{{upload},le="+Inf"}}'] == 2
+    assert samples[f"http_request_duration_seconds_count{{{upload}}}"] == 2
+    assert samples[f"http_request_body_bytes_total{{{upload}}}"] == 1024
+    assert samples[f"http_requests_in_flight{{{upload}}}"] == 0
+    assert samples['http_requests_in_flight{method="GET",route="/api/ipads"}'] == 1
+    assert samples['db_commands_total{method="GET",route="/api/ipads"}'] == 3
+
+
+def test_label_values_are_escaped():
+    helpers = _load_metrics()
+    assert helpers["metric_labels"]("GET", 'a"b\\c\nd') == 'method="GET",route="a\\"b\\\\c\\nd"'
@@ -0,0 +1,48 @@
+"""
+Timestamps are stored as native BSON dates. Legacy ISO strings are only
+parsed by the migration and by the export date formatting.
+
+The helpers are executed in isolation from the source of backend/server.py,
+so the checks run without MongoDB or the backend dependencies installed.
+"""
+
+import unicodedata
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from .server_source import load_definitions
+
+
+def _load_helpers():
+    return load_definitions(
+        ["parse_legacy_timestamp", "format_german_date", "prepare_for_mongo", "add_search_keys",
+         "fold_search_key", "SEARCH_KEY_FIELDS", "UMLAUT_FOLDS"],
+        {"datetime": datetime, "timezone": timezone, "Optional": Optional, "Dict": Dict,
+         "unicodedata": unicodedata},
+    )
+
+
+def test_legacy_strings_parse_to_aware_datetimes():
+    parse = _load_helpers()["parse_legacy_timestamp"]
+    expected = datetime(2020, 5, 17, 8, 30, tzinfo=timezone.utc)
+    assert parse("2020-05-17T08:30:00+00:00") == expected
+    assert parse("2020-05-17T08:30:00Z") == expected
+    assert parse("2020-05-17T08:30:00") == expected
+    assert parse("17.05.2020") is None
+
+
+def test_german_date_accepts_dates_and_legacy_strings():
+    format_german_date = _load_helpers()["format_german_date"]
+    assert format_german_date(datetime(2020, 5, 17, tzinfo=timezone.utc)) == "17.05.2020"
+    assert format_german_date("2020-05-17T08:30:00+00:00") == "17.05.2020"
+    assert format_german_date("kaputt") == ""
+    assert format_german_date(None) == ""
+
+
+def test_prepare_for_mongo_keeps_datetimes():
+    prepare_for_mongo = _load_helpers()["prepare_for_mongo"]
+    created_at = datetime(2020, 5, 17, 8, 30, tzinfo=timezone.utc)
+    doc = prepare_for_mongo({"sus_nachn": "Müller", "created_at": created_at, "unassigned_at": None})
+    assert doc["created_at"] is created_at
+    assert doc["unassigned_at"] is None
+    assert doc["sus_nachn_key"] == "mueller"